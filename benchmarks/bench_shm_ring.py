@@ -0,0 +1,128 @@
+#!/bin/python3
+
+#
+#  Copyright (c) 2023  Erol Yesin/SandboxZilla
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Compare the SharedMemoryRing transport with a multiprocessing.Queue.
+
+Each worker process logs the same records through either a SharedMemoryHandler
+or a QueueHandler, while a listener thread in this process drains them into a
+counting handler.  The producer side time (what the application pays per
+call) and the end-to-end time are reported for both transports.
+
+With a single worker the ring is also measured without its lock (shm-single).
+
+usage: python benchmarks/bench_shm_ring.py [--workers 4] [--records 20000] [--size 100] [--capacity 4]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from logging import handlers as hdls
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src", "logger_wrapper"))
+
+from shm_ring import SharedMemoryHandler, SharedMemoryListener, SharedMemoryRing
+
+
+class CountingHandler(logging.Handler):
+    """Format and count the records, standing in for the real output."""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+        self.setFormatter(logging.Formatter("%(asctime)s,[%(levelname)s:pid=%(process)d:"
+                                            "%(threadName)s:%(module)s:%(funcName)s:%(lineno)d],%(message)s"))
+
+    def emit(self, record):
+        self.format(record)
+        self.count += 1
+
+
+def produce(handler: logging.Handler, records: int, size: int, timings):
+    """Log the records through the handler and report the time spent."""
+    logger = logging.getLogger("bench_producer")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    payload = "x" * size
+    start = time.perf_counter()
+    for index in range(records):
+        logger.info("record %d %s", index, payload)
+    timings.put(time.perf_counter() - start)
+
+
+def run(transport: str, workers: int, records: int, size: int, capacity: int) -> dict:
+    """Run one transport and return its timings."""
+    counter = CountingHandler()
+    timings = multiprocessing.Queue()
+    if transport.startswith("shm"):
+        ring = SharedMemoryRing(capacity=capacity, timeout=float("inf"), single_producer=transport == "shm-single")
+        listener = SharedMemoryListener(ring, counter, poll_interval=0.001)
+        handler = SharedMemoryHandler(ring)
+    else:
+        ring = None
+        log_queue = multiprocessing.Queue()
+        listener = hdls.QueueListener(log_queue, counter)
+        handler = hdls.QueueHandler(log_queue)
+
+    listener.start()
+    start = time.perf_counter()
+    processes = [multiprocessing.Process(target=produce, args=(handler, records, size, timings))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    producer_times = [timings.get() for _ in processes]
+    for process in processes:
+        process.join()
+    while counter.count < workers * records:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    listener.stop()
+
+    if ring is not None:
+        ring.close()
+        ring.unlink()
+
+    return {"transport": transport,
+            "records": counter.count,
+            "producer_us": 1e6 * max(producer_times) / records,
+            "end_to_end_s": elapsed,
+            "throughput": counter.count / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--records", type=int, default=20000, help="records per worker")
+    parser.add_argument("--size", type=int, default=100, help="message payload size")
+    parser.add_argument("--capacity", type=int, default=4,
+                        help="ring size in MiB, a full ring makes the producers wait for the consumer")
+    args = parser.parse_args()
+
+    print(f"{'transport':<10}{'records':>10}{'us/record':>12}{'elapsed s':>12}{'records/s':>12}")
+    transports = ("queue", "shm", "shm-single") if args.workers == 1 else ("queue", "shm")
+    for transport in transports:
+        result = run(transport, args.workers, args.records, args.size, args.capacity << 20)
+        print(f"{result['transport']:<10}{result['records']:>10}{result['producer_us']:>12.2f}"
+              f"{result['end_to_end_s']:>12.3f}{result['throughput']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,19 @@ This package provides a wrapper for the built-in logging packages:
     Using this class, you can set the instance name in the logger.
     This class uses the logging.Logger class.
 
+3.  OverflowQueue: A bounded queue with overflow policies to place in front of the handlers.
+
+4.  RoutingHandler: A handler that splits the records between outputs by level,
+    logger name and instance name through a cached dispatch table.
+
+5.  SharedMemoryRing: A shared memory ring buffer transport between the logging
+    processes and the process owning the handlers on the same host.
+
+6.  CallSiteProfiler: An opt-in profiler of the logging cost per call site.
+
+7.  loadgen: A command line load generator and log replayer to size a logger
+    configuration (python -m logger_wrapper.loadgen, or logger-wrapper-loadgen).
+
 For detailed documentation and example usage, refer to the README.md file.
 
 Copyright (c) 2023. Erol Yesin/SandboxZilla
@@ -36,4 +49,34 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 
-from .logger_wrapper import LoggerWrapper, PseudoSingletonLogger
+import importlib
+
+__version__ = '0.1.0'
+
+# The classes are imported on first access, so importing the package does not
+# pay for logging.handlers, multiprocessing... unless they are used.
+_LAZY = {"LoggerWrapper": "logger_wrapper",
+         "PseudoSingletonLogger": "logger_wrapper",
+         "LazyFileHandler": "logger_wrapper",
+         "OverflowQueue": "overflow_queue",
+         "OverflowQueueHandler": "overflow_queue",
+         "Route": "routing",
+         "RoutingHandler": "routing",
+         "SharedMemoryHandler": "shm_ring",
+         "SharedMemoryListener": "shm_ring",
+         "SharedMemoryRing": "shm_ring",
+         "CallSiteProfiler": "profiler"}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{_LAZY[name]}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,567 @@
+#!/bin/python3
+"""
+ **[loadgen]**
+
+A load generator and log replayer to size a PseudoSingletonLogger
+configuration before rolling it out.
+
+Two modes::
+
+    *generate:*  Synthetic load from threads and/or processes with a configurable
+                 level mix, message sizes, meta/use_instance settings and exception rate.
+    *replay:*    Replays the timing, levels and message sizes of an existing log
+                 file written in the standard PseudoSingletonLogger format.
+
+Each configuration reports the throughput and the latency percentiles of
+the logging calls.  Everything runs offline: the records go to files in a
+scratch directory or to a stand-in sink that formats and discards them.
+
+**Example Usage::**
+
+<code >
+python -m logger_wrapper.loadgen generate --threads 4 --records 10000 --levels DEBUG=70,INFO=25,ERROR=5
+python -m logger_wrapper.loadgen generate --config sizing.json --json
+python -m logger_wrapper.loadgen replay .logs/test.log --speed 10 --sink file
+python -m logger_wrapper.loadgen generate --handlers myapp.logging_setup:handlers
+< / code >
+
+A --config file holds a JSON list of configurations, each overriding the
+command line values with the same (underscored) names, plus an optional 'label'.
+
+--handlers measures the handlers of the real setup instead of the offline
+sinks: it names a 'module:callable' returning the list of handlers passed to
+PseudoSingletonLogger(handlers=...).  The callable is called once per
+configuration (once per process with --processes).
+
+    Copyright (c)  2023.  Erol Yesin/Sandboxzilla
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+    IN THE SOFTWARE.
+"""
+import argparse
+import functools
+import importlib
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+try:
+    from .logger_wrapper import LoggerWrapper, PseudoSingletonLogger
+    from .overflow_queue import OVERFLOW_POLICIES
+except ImportError:
+    from logger_wrapper import LoggerWrapper, PseudoSingletonLogger
+    from overflow_queue import OVERFLOW_POLICIES
+
+SINKS = ("null", "file")
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Seconds between the checks of the worker processes while waiting for their results.
+_POLL_SECONDS = 1.0
+
+# 2023-05-03 23:15:41,123,LoggerWrapper Demo,[INFO:pid=3356970:MainThread:log1:...],test of 0
+_ENTRY = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}),")
+_LEVEL = re.compile(r"\[(\w+):pid=")
+
+_RUNS = itertools.count()
+
+_DEFAULTS = {"label": None,
+             "threads": 1,
+             "processes": 0,
+             "records": 10000,
+             "levels": "DEBUG=40,INFO=40,WARNING=15,ERROR=5",
+             "size": "100",
+             "meta": True,
+             "use_instance": True,
+             "exception_rate": 0.0,
+             "sink": "null",
+             "handlers": None,
+             "output": None,
+             "queue_size": None,
+             "overflow": "block",
+             "seed": 0,
+             "speed": 1.0}
+
+# The accepted types of the configuration values, as given on the command line or in JSON.
+_TYPES = {"label": (str, type(None)),
+          "threads": int,
+          "processes": int,
+          "records": int,
+          "levels": str,
+          "size": (str, int),
+          "meta": bool,
+          "use_instance": bool,
+          "exception_rate": (float, int),
+          "sink": str,
+          "handlers": (str, type(None)),
+          "output": (str, type(None)),
+          "queue_size": (int, type(None)),
+          "overflow": str,
+          "seed": int,
+          "speed": (float, int)}
+
+
+class DiscardHandler(logging.Handler):
+    """A stand-in sink that formats every record, as a real output would, and discards it."""
+
+    def emit(self, record: logging.LogRecord):
+        self.format(record)
+
+
+def parse_levels(levels: str) -> tuple[list[int], list[float]]:
+    """
+    Parse a level mix like 'DEBUG=70,INFO=25,ERROR=5'.
+
+    Returns:
+        tuple: The level numbers and their weights.
+    """
+    names = logging.getLevelNamesMapping()
+    numbers, weights = [], []
+    for item in levels.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip().upper() not in names:
+            raise ValueError(f"unknown level '{name.strip()}' in '{levels}'")
+        numbers.append(names[name.strip().upper()])
+        try:
+            weights.append(float(weight or 1))
+        except ValueError:
+            raise ValueError(f"bad weight '{weight}' for {name.strip()} in '{levels}'") from None
+        if weights[-1] < 0:
+            raise ValueError(f"negative weight for {name.strip()} in '{levels}'")
+    if not sum(weights) > 0:
+        raise ValueError(f"the level weights of '{levels}' add up to 0")
+    return numbers, weights
+
+
+def parse_size(size) -> tuple[int, int]:
+    """
+    Parse a message size like '100' or a range like '50-500'.
+
+    Returns:
+        tuple: The smallest and the largest message size.
+    """
+    low, _, high = str(size).partition("-")
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise ValueError(f"bad message size '{size}', expected a size like 100 or a range like 50-500") from None
+    if low < 0 or high < low:
+        raise ValueError(f"bad message size range '{size}'")
+    return low, high
+
+
+def validate(config: dict):
+    """
+    Check the values of a configuration before any worker starts.
+
+    Args:
+        config (dict): The configuration, with every key of the defaults.
+
+    Raises:
+        ValueError: Naming the first key or value that cannot be used.
+    """
+    unknown = sorted(set(config) - set(_DEFAULTS))
+    if unknown:
+        raise ValueError(f"unknown configuration keys {unknown}, expected some of {sorted(_DEFAULTS)}")
+    for key, types in _TYPES.items():
+        value = config[key]
+        # bool is an int, but not a count nor a rate.
+        if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+            names = " or ".join(kind.__name__ for kind in (types if isinstance(types, tuple) else (types,)))
+            raise ValueError(f"{key} must be {names}, got {value!r}")
+    parse_levels(config["levels"])
+    parse_size(config["size"])
+    for key, low in (("threads", 1), ("records", 0), ("processes", 0)):
+        if config[key] < low:
+            raise ValueError(f"{key} must be at least {low}, got {config[key]}")
+    if not 0 <= config["exception_rate"] <= 1:
+        raise ValueError(f"exception_rate must be between 0 and 1, got {config['exception_rate']}")
+    if config["speed"] < 0:
+        raise ValueError(f"speed must not be negative, got {config['speed']}")
+    if config["queue_size"] is not None and config["queue_size"] < 1:
+        raise ValueError(f"queue_size must be positive, got {config['queue_size']}")
+    if config["overflow"] not in OVERFLOW_POLICIES:
+        raise ValueError(f"unknown overflow policy '{config['overflow']}', expected one of {OVERFLOW_POLICIES}")
+    if config["sink"] not in SINKS:
+        raise ValueError(f"unknown sink '{config['sink']}', expected one of {SINKS}")
+    if config["handlers"]:
+        load_handlers(config["handlers"])
+
+
+def percentile(ordered: list, percent: float) -> float:
+    """The nearest rank percentile of a sorted list."""
+    if not ordered:
+        return 0
+    rank = max(math.ceil(percent / 100.0 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def read_log(file_name: str) -> list[tuple[float, int, int, bool]]:
+    """
+    Read the entries of a log file in the standard format.
+
+    Lines that do not start with a timestamp (tracebacks, multi-line messages)
+    are added to the previous entry.
+
+    Returns:
+        list[tuple]: (seconds since the first entry, level, message size, has exception)
+    """
+    names = logging.getLevelNamesMapping()
+    entries = []
+    first = None
+    with open(file_name, encoding="utf-8", errors="replace", mode="r") as f:
+        for line in f:
+            match = _ENTRY.match(line)
+            if match is None:
+                if entries:
+                    offset, level, size, has_exception = entries[-1]
+                    entries[-1] = (offset, level, size + len(line),
+                                   has_exception or line.startswith("Traceback"))
+                continue
+            stamp = time.mktime(time.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")) + int(match.group(2)) / 1000
+            if first is None:
+                first = stamp
+            level = _LEVEL.search(line)
+            levelno = names.get(level.group(1), logging.INFO) if level else logging.INFO
+            message = line.rstrip("\n")
+            size = len(message) - message.find("],") - 2 if "]," in message else len(message) - match.end()
+            entries.append((stamp - first, levelno, size, False))
+    return entries
+
+
+def load_handlers(spec: str):
+    """
+    Resolve a 'module:callable' handler factory.
+
+    Args:
+        spec (str): The module and the (dotted) name of the callable returning the handler list.
+
+    Returns:
+        callable: The handler factory.
+    """
+    module_name, _, attribute = spec.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"handlers must be given as 'module:callable', got '{spec}'")
+    try:
+        factory = importlib.import_module(module_name)
+        for name in attribute.split("."):
+            factory = getattr(factory, name)
+    except (ImportError, AttributeError) as error:
+        raise ValueError(f"cannot load the handlers '{spec}': {error}") from error
+    if not callable(factory):
+        raise ValueError(f"the handlers '{spec}' are not callable")
+    return factory
+
+
+def _exc_info():
+    try:
+        raise RuntimeError("loadgen synthetic exception")
+    except RuntimeError:
+        return sys.exc_info()
+
+
+def _setup(config: dict, name: str):
+    """Create the PseudoSingletonLogger under test, before any worker thread uses it."""
+    if config["handlers"]:
+        handlers = list(load_handlers(config["handlers"])())
+        if not all(isinstance(handler, logging.Handler) for handler in handlers):
+            raise TypeError(f"the handlers '{config['handlers']}' did not return a list of logging.Handler")
+    elif config["sink"] == "file":
+        handlers = [logging.FileHandler(os.path.join(config["output"], f"{name}.log"))]
+    else:
+        handlers = [DiscardHandler()]
+    logger = PseudoSingletonLogger(name=name,
+                                   meta=config["meta"],
+                                   use_instance=config["use_instance"],
+                                   date_filename=False,
+                                   handlers=handlers,
+                                   queue_size=config["queue_size"],
+                                   overflow=config["overflow"])
+    logger.propagate = False
+
+
+def _logger(config: dict, name: str, instance_name: str):
+    if config["use_instance"]:
+        return LoggerWrapper(name=name, instance_name=instance_name)
+    return PseudoSingletonLogger(name=name)
+
+
+def _finish(name: str) -> int:
+    """Drain the logger queue, if any, close the outputs and return the dropped count."""
+    logger = PseudoSingletonLogger(name=name)
+    logger.stop_queue(logger_name=name)
+    # pylint: disable=protected-access
+    for handler in PseudoSingletonLogger._output_handlers(logger):
+        handler.close()
+    if logger.overflow_queue is None:
+        return 0
+    return sum(logger.overflow_queue.drop_counts().values())
+
+
+def _generate(config: dict, name: str, worker: int, latencies: list, mix: tuple, sizes: tuple):
+    logger = _logger(config, name, f"worker{worker}")
+    levels, weights = mix
+    low, high = sizes
+    rnd = random.Random(config["seed"] + worker)
+    exc_info = _exc_info()
+    exception_rate = config["exception_rate"]
+
+    plan = [(level, "x" * rnd.randint(low, high), rnd.random() < exception_rate)
+            for level in rnd.choices(levels, weights, k=config["records"])]
+    timer = time.perf_counter_ns
+    append = latencies.append
+    for level, message, with_exception in plan:
+        start = timer()
+        logger.log(level, message, exc_info=exc_info if with_exception else None)
+        append(timer() - start)
+
+
+def _replay(config: dict, name: str, entries: list, latencies: list):
+    logger = _logger(config, name, "replay")
+    exc_info = _exc_info()
+    speed = config["speed"]
+    timer = time.perf_counter_ns
+    append = latencies.append
+    origin = time.perf_counter()
+    for offset, level, size, with_exception in entries:
+        if speed > 0:
+            delay = origin + offset / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        start = timer()
+        logger.log(level, "x" * size, exc_info=exc_info if with_exception else None)
+        append(timer() - start)
+
+
+def _threads(target, config: dict, name: str, results):
+    """
+    Run the target in the configured threads and put the latencies, the drops
+    and the first error, if any, on the results queue.
+    """
+    try:
+        _setup(config, name)
+    except Exception:  # pylint: disable=broad-except
+        results.put(([], 0, traceback.format_exc()))
+        return
+    latencies = [[] for _ in range(config["threads"])]
+    errors = []
+
+    def work(index: int):
+        try:
+            target(config, name, index, latencies[index])
+        except Exception:  # pylint: disable=broad-except
+            errors.append(traceback.format_exc())
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(config["threads"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    dropped = _finish(name)
+    results.put(([latency for worker in latencies for latency in worker], dropped, errors[0] if errors else None))
+
+
+def _collect(processes: list, results) -> list:
+    """Wait for the result of every process, without hanging on a process that died before reporting."""
+    collected = []
+    while len(collected) < len(processes):
+        try:
+            collected.append(results.get(timeout=_POLL_SECONDS))
+        except queue.Empty:
+            exit_codes = [process.exitcode for process in processes]
+            if any(exit_codes) or None not in exit_codes:
+                # A process may have posted its result and exited since the get timed out.
+                try:
+                    while len(collected) < len(processes):
+                        collected.append(results.get_nowait())
+                except queue.Empty:
+                    for process in processes:
+                        process.terminate()
+                    raise RuntimeError(f"a worker process exited without a result, exit codes {exit_codes}") from None
+    for process in processes:
+        process.join()
+    return collected
+
+
+class _ListQueue(list):
+    """The results 'queue' when no process is started."""
+
+    def put(self, item):
+        self.append(item)
+
+
+def run(config: dict, mode: str = "generate", entries: list = None) -> dict:
+    """
+    Run one configuration.
+
+    Args:
+        config (dict): The configuration, missing keys take the defaults.
+        mode (str, optional): 'generate' or 'replay'.
+        entries (list, optional): The entries to replay, from read_log.
+
+    Returns:
+        dict: The configuration label, record count, seconds, throughput,
+              latency percentiles in microseconds and dropped records.
+    """
+    config = {**_DEFAULTS, **config}
+    validate(config)
+    name = f"loadgen-{config['label'] or mode}-{next(_RUNS)}"
+    scratch = None
+    if config["sink"] == "file" and not config["handlers"] and config["output"] is None:
+        scratch = tempfile.TemporaryDirectory(prefix="loadgen")
+        config["output"] = scratch.name
+
+    if mode == "replay":
+        config["threads"], config["processes"] = 1, 0
+
+        def target(config, name, index, latencies):
+            _replay(config, name, entries, latencies)
+    else:
+        target = functools.partial(_generate, mix=parse_levels(config["levels"]), sizes=parse_size(config["size"]))
+
+    try:
+        start = time.perf_counter()
+        if config["processes"]:
+            results = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=_threads,
+                                                 args=(target, config, f"{name}-{index}", results))
+                         for index in range(config["processes"])]
+            for process in processes:
+                process.start()
+            collected = _collect(processes, results)
+        else:
+            results = _ListQueue()
+            _threads(target, config, name, results)
+            collected = results
+        elapsed = time.perf_counter() - start
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+    errors = [error for _, _, error in collected if error is not None]
+    if errors:
+        raise RuntimeError(f"a worker failed:\n{errors[0]}")
+
+    latencies = sorted(latency for worker, _, _ in collected for latency in worker)
+    result = {"label": config["label"] or mode,
+              "records": len(latencies),
+              "seconds": elapsed,
+              "throughput": len(latencies) / elapsed if elapsed else 0.0,
+              "dropped": sum(dropped for _, dropped, _ in collected)}
+    for percent in PERCENTILES:
+        result[f"p{percent:g}_us"] = percentile(latencies, percent) / 1000
+    result["max_us"] = (latencies[-1] if latencies else 0) / 1000
+    return result
+
+
+def format_results(results: list[dict]) -> str:
+    """Render the results as a table."""
+    columns = ["label", "records", "seconds", "throughput"] + \
+              [f"p{percent:g}_us" for percent in PERCENTILES] + ["max_us", "dropped"]
+    width = max([len("label")] + [len(str(result["label"])) for result in results]) + 2
+    lines = [f"{'label':<{width}}" + "".join(f"{column:>12}" for column in columns[1:])]
+    for result in results:
+        cells = [f"{result['label']:<{width}}", f"{result['records']:>12}", f"{result['seconds']:>12.3f}",
+                 f"{result['throughput']:>12.0f}"]
+        cells += [f"{result[column]:>12.1f}" for column in columns[4:-1]]
+        cells.append(f"{result['dropped']:>12}")
+        lines.append("".join(cells))
+    return "\n".join(lines)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="logger-wrapper-loadgen",
+                                     description="Size a logger configuration with synthetic or replayed load.")
+    parser.add_argument("mode", choices=("generate", "replay"))
+    parser.add_argument("log_file", nargs="?", help="the log file to replay")
+    parser.add_argument("--config", help="JSON list of configurations to run")
+    parser.add_argument("--label")
+    parser.add_argument("--threads", type=int, default=_DEFAULTS["threads"])
+    parser.add_argument("--processes", type=int, default=_DEFAULTS["processes"],
+                        help="worker processes, each running --threads threads")
+    parser.add_argument("--records", type=int, default=_DEFAULTS["records"], help="records per thread")
+    parser.add_argument("--levels", default=_DEFAULTS["levels"], help="level mix, e.g. DEBUG=70,INFO=30")
+    parser.add_argument("--size", default=_DEFAULTS["size"], help="message size or range, e.g. 50-500")
+    parser.add_argument("--meta", action=argparse.BooleanOptionalAction, default=_DEFAULTS["meta"])
+    parser.add_argument("--use-instance", action=argparse.BooleanOptionalAction, default=_DEFAULTS["use_instance"])
+    parser.add_argument("--exception-rate", type=float, default=_DEFAULTS["exception_rate"])
+    parser.add_argument("--sink", choices=SINKS, default=_DEFAULTS["sink"])
+    parser.add_argument("--handlers",
+                        help="'module:callable' returning the handlers to measure, instead of the --sink")
+    parser.add_argument("--output", help="directory of the file sink, a scratch directory by default")
+    parser.add_argument("--queue-size", type=int, default=_DEFAULTS["queue_size"])
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default=_DEFAULTS["overflow"])
+    parser.add_argument("--seed", type=int, default=_DEFAULTS["seed"])
+    parser.add_argument("--speed", type=float, default=_DEFAULTS["speed"],
+                        help="replay speed factor, 0 replays as fast as possible")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    """The command line entry point."""
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.mode == "replay" and args.log_file is None:
+        parser.error("replay needs a log file")
+
+    # The handler factories live in the project being sized, as with python -m.
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    base = {key: value for key, value in vars(args).items() if key in _DEFAULTS}
+    configs = [base]
+    if args.config:
+        with open(args.config, encoding="utf-8", mode="r") as f:
+            try:
+                configs = json.load(f)
+            except ValueError as error:
+                parser.error(f"{args.config}: {error}")
+        if not isinstance(configs, list) or not all(isinstance(config, dict) for config in configs):
+            parser.error(f"{args.config}: expected a JSON list of objects")
+        configs = [{**base, **config} for config in configs]
+    for index, config in enumerate(configs):
+        config["label"] = config["label"] or f"{args.mode}{index}"
+        try:
+            validate({**_DEFAULTS, **config})
+        except ValueError as error:
+            parser.error(f"{config['label']}: {error}" if args.config else str(error))
+
+    entries = read_log(args.log_file) if args.mode == "replay" else None
+    results = []
+    failed = False
+    for config in configs:
+        try:
+            results.append(run(config, mode=args.mode, entries=entries))
+        except RuntimeError as error:
+            print(f"{config['label']}: {error}", file=sys.stderr)
+            failed = True
+    if results:
+        print(json.dumps(results, indent=2) if args.json else format_results(results))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,11 @@ formating to force a standard logging format.
 If given the optiopnal 'app_name' the name of the application is used in the header.
 If given the 'use_instance' flag a space is allocated for the instance name
 for the client class to inject during logging.
+If given the optional 'queue_size' the handlers are drained by a background
+thread through a bounded OverflowQueue.  The 'overflow' policy decides what
+happens when the queue is full: 'block' (up to 'overflow_timeout' seconds),
+'drop_newest', 'drop_oldest' or 'drop_lowest' (sheds the lowest severity first).
+If given the 'profile' flag the logging cost is measured per call site.
 The PsudoSigletonLogger class has the following methods::
 
     *set_default_format(logger_name: str = None, app_name: str = None, use_instance: bool = False)*
@@ -33,6 +38,14 @@ The PsudoSigletonLogger class has the following methods::
     will be removed.
     If no logger_name than the default is the last_logger instance used.
 
+    *stop_queue(logger_name: str = None):*
+    Drains the OverflowQueue in front of the handlers and stops its listener thread.
+    Only loggers created with 'queue_size' have a queue.  Called at exit.
+
+    *get_profile_report(logger_name: str = None, top: int = 10):*
+    Reports the call sites with the most calls, time, bytes and dropped records.
+    Only loggers created with 'profile' are measured.
+
     *version():*  The package version.
 
 **LoggerWrapper::**
@@ -112,12 +125,52 @@ if __name__ == "__main__":
 __author__ = 'Erol Yesin'
 __version__ = '0.1.0'
 
+import atexit
+import functools
+import importlib
+import os
 import traceback
 from collections.abc import Iterable
 import time
 import logging
-from logging import handlers as hdls
-from pathlib import Path, PosixPath
+
+# logging.handlers, pathlib and the optional features (queue,
+# profiler...) are imported on first use to keep the import of this module cheap.
+
+
+def _submodule(name: str):
+    """Import a module of this package, whether loaded as a package or from the source directory."""
+    if __package__:
+        return importlib.import_module(f"{__package__}.{name}")
+    return importlib.import_module(name)
+
+
+class LazyFileHandler(logging.FileHandler):
+    """
+    A FileHandler that creates the file, and its parent directories, on the first record.
+
+    Args:
+        filename (str): The log file name.
+
+    Args (all optional):
+        mode (str): The mode used to open the file.
+        encoding (str): The encoding used to open the file.
+        errors (str): How encoding errors are handled.
+        replaces (str): A file removed just before the log file is created.
+    """
+
+    def __init__(self, filename, mode: str = 'a', encoding: str = None, errors: str = None,
+                 replaces: str = None):
+        super().__init__(filename, mode=mode, encoding=encoding, delay=True, errors=errors)
+        self.replaces = replaces
+
+    def _open(self):
+        if self.replaces is not None:
+            if os.path.exists(self.replaces):
+                os.unlink(self.replaces)
+            self.replaces = None
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
 
 
 class PseudoSingletonLogger(logging.Logger):
@@ -130,7 +183,14 @@ class PseudoSingletonLogger(logging.Logger):
         level (int): The log level to be set for the logger.
         meta (bool): Whether or not to include metadata in the log output.
         date_filename (bool): Whether or not to include the date in the log file name.
+                              The dated file is created by the first record.
         handlers (list[logging.Handler]): A list of logging handlers to be used by the logger.
+        queue_size (int): If given, the handlers are drained by a background thread
+                          through an OverflowQueue of this size.
+        overflow (str): The overflow policy of the queue. One of 'block', 'drop_newest',
+                        'drop_oldest' or 'drop_lowest'.
+        overflow_timeout (float): Seconds the 'block' policy waits before dropping.
+        profile (bool): Whether or not to measure the logging cost per call site.
     """
     __instance = {"root": None}
     __last_instance = None
@@ -143,7 +203,11 @@ class PseudoSingletonLogger(logging.Logger):
                 meta: bool = True,
                 use_instance: bool = False,
                 date_filename: bool = True,
-                handlers=None):
+                handlers=None,
+                queue_size: int = None,
+                overflow: str = "block",
+                overflow_timeout: float = None,
+                profile: bool = False):
 
         if name not in PseudoSingletonLogger.__instance or PseudoSingletonLogger.__instance[name] is None:
             __this_instance = logging.getLogger(name=name)
@@ -157,38 +221,39 @@ class PseudoSingletonLogger(logging.Logger):
 
             __this_instance.app_name = app_name
             __this_instance.meta = meta
-            __this_instance.handlers = handlers
+            __this_instance.handlers = []
 
-            for handler in __this_instance.handlers:
+            for handler in handlers:
                 if not isinstance(handler, logging.Handler):
                     continue
-                if isinstance(handler, logging.FileHandler):
-                    if date_filename:
-                        handler_dict = handler.__dict__.copy()
-                        handler.close()
-                        __this_instance.handlers.remove(handler)
-                        del handler
-                        file_name = PosixPath(handler_dict["baseFilename"])
-                        if file_name.exists():
-                            file_name.unlink()
-
-                        file_name.parent.mkdir(parents=True, exist_ok=True)
-
-                        sfx = file_name.suffix
-                        if len(sfx) == 0:
-                            sfx = '.log'
-
-                        handler = logging.FileHandler(filename=str(PosixPath(file_name.parent,
-                                                                             file_name.stem +
-                                                                             time.strftime("_%Y%m%d%H%M%S") +
-                                                                             sfx)),
-                                                      mode=handler_dict["mode"],
-                                                      encoding=handler_dict["encoding"],
-                                                      delay=handler_dict["delay"],
-                                                      errors=handler_dict["errors"])
+                if date_filename and isinstance(handler, logging.FileHandler):
+                    handler = PseudoSingletonLogger._dated_file_handler(handler)
 
                 __this_instance.addHandler(hdlr=handler)
 
+            __this_instance.profiler = None
+            if profile:
+                __this_instance.profiler = _submodule("profiler").CallSiteProfiler()
+                __this_instance.handle = __this_instance.profiler.wrap(__this_instance.handle)
+
+            __this_instance.overflow_queue = None
+            __this_instance.queue_listener = None
+            if queue_size is not None:
+                from logging import handlers as hdls
+                overflow_queue = _submodule("overflow_queue")
+                log_queue = overflow_queue.OverflowQueue(maxsize=queue_size,
+                                                         policy=overflow,
+                                                         timeout=overflow_timeout,
+                                                         on_drop=getattr(__this_instance.profiler, "drop", None),
+                                                         name=name)
+                __this_instance.overflow_queue = log_queue
+                __this_instance.queue_listener = hdls.QueueListener(log_queue,
+                                                                    *__this_instance.handlers,
+                                                                    respect_handler_level=True)
+                __this_instance.handlers = [overflow_queue.OverflowQueueHandler(log_queue)]
+                __this_instance.queue_listener.start()
+                atexit.register(PseudoSingletonLogger.stop_queue, logger_name=name)
+
             PseudoSingletonLogger.__instance[name] = __this_instance
             PseudoSingletonLogger.set_default_format(logger_name=name,
                                                      app_name=app_name,
@@ -198,10 +263,31 @@ class PseudoSingletonLogger(logging.Logger):
             PseudoSingletonLogger.__instance[name].remove_handler = PseudoSingletonLogger.remove_handler
             PseudoSingletonLogger.__instance[name].version = PseudoSingletonLogger.version
             PseudoSingletonLogger.__instance[name].set_default_format = PseudoSingletonLogger.set_default_format
+            PseudoSingletonLogger.__instance[name].stop_queue = PseudoSingletonLogger.stop_queue
+            PseudoSingletonLogger.__instance[name].get_profile_report = PseudoSingletonLogger.get_profile_report
 
         PseudoSingletonLogger.__last_instance = PseudoSingletonLogger.__instance[name]
         return PseudoSingletonLogger.__last_instance
 
+    @staticmethod
+    def _dated_file_handler(handler: logging.FileHandler) -> logging.FileHandler:
+        """
+        Replace a FileHandler by one writing to a file name stamped with the current date.
+
+        Nothing touches the file system until the first record: the original
+        file is then removed and the dated file created.
+        """
+        handler.close()
+        root, sfx = os.path.splitext(handler.baseFilename)
+        if len(sfx) == 0:
+            sfx = '.log'
+
+        return LazyFileHandler(filename=root + time.strftime("_%Y%m%d%H%M%S") + sfx,
+                               mode=handler.mode,
+                               encoding=handler.encoding,
+                               errors=handler.errors,
+                               replaces=handler.baseFilename)
+
     @classmethod
     def set_default_format(cls,
                            logger_name: str = None,
@@ -235,9 +321,21 @@ class PseudoSingletonLogger(logging.Logger):
         __local_instance.format_keys.append('%(message)s')
 
         __local_instance.formatter = logging.Formatter(''.join(__local_instance.format_keys))
-        for handler in __local_instance.handlers:
+        for handler in PseudoSingletonLogger._output_handlers(__local_instance):
             handler.setFormatter(__local_instance.formatter)
 
+    @staticmethod
+    def _output_handlers(local_instance: logging.Logger) -> list[logging.Handler]:
+        """
+        The handlers that write the log entries.
+
+        When the logger is fronted by an OverflowQueue these are the handlers
+        drained by the queue listener rather than the queue handler itself.
+        """
+        if getattr(local_instance, "queue_listener", None) is not None:
+            return list(local_instance.queue_listener.handlers)
+        return list(local_instance.handlers)
+
     @classmethod
     def get_output_path(cls,
                         logger_name: str = None,
@@ -251,16 +349,26 @@ class PseudoSingletonLogger(logging.Logger):
                                             will be returned in a list.
         NOTE: Not fully tested
         """
+        from logging import handlers as hdls
+
         if logger_name is None or logger_name not in PseudoSingletonLogger.__instance:
             _local_logger = PseudoSingletonLogger.__last_instance
         else:
             _local_logger = PseudoSingletonLogger.__instance[logger_name]
 
         paths = []
-        for handler in _local_logger.handlers:
+        handlers = list(_local_logger.handlers)
+        if getattr(_local_logger, "queue_listener", None) is not None:
+            handlers += _local_logger.queue_listener.handlers
+        for handler in handlers:
             if isinstance(handler, logging.Handler):
-                if handler_type and isinstance(handler, handler_type):
-                    paths.append(str(handler.stream.name))
+                if hasattr(handler, "get_output_path"):
+                    # RoutingHandler, SharedMemoryHandler... report their own targets.
+                    if handler_type is None or isinstance(handler, handler_type):
+                        paths.extend(handler.get_output_path())
+                elif handler_type and isinstance(handler, handler_type):
+                    # File handlers may not have opened their stream yet.
+                    paths.append(str(getattr(handler, "baseFilename", None) or handler.stream.name))
                 elif isinstance(handler, (hdls.SysLogHandler,
                                           hdls.SocketHandler)):
                     paths.append(str(handler.address))
@@ -272,6 +380,8 @@ class PseudoSingletonLogger(logging.Logger):
                     paths.append(handler.url)
                 elif isinstance(handler, hdls.QueueHandler):
                     paths.append("<queue>")
+                elif isinstance(handler, logging.FileHandler):
+                    paths.append(handler.baseFilename)
                 elif isinstance(handler, logging.StreamHandler):
                     paths.append(handler.stream.name)
         return paths
@@ -295,6 +405,61 @@ class PseudoSingletonLogger(logging.Logger):
             if isinstance(handler, handler_type):
                 PseudoSingletonLogger.__instance[logger_name].handlers.remove(handler)
 
+        listener = getattr(PseudoSingletonLogger.__instance[logger_name], "queue_listener", None)
+        if listener is not None:
+            listener.handlers = tuple(handler for handler in listener.handlers
+                                      if not isinstance(handler, handler_type))
+
+    @classmethod
+    def stop_queue(cls, logger_name: str = None):
+        """
+        Drain the overflow queue and stop its listener thread.
+
+        The output handlers are put back on the logger, so the records logged
+        afterwards (e.g. by later atexit hooks) are written directly.  Records
+        racing with the stop are refused by the closed queue and counted as dropped.
+
+        Called at exit for every logger created with a 'queue_size'.
+        Safe to call more than once or on a logger without a queue.
+        """
+        if logger_name is None:
+            logger_name = PseudoSingletonLogger.__last_instance.logger_name
+
+        local_instance = PseudoSingletonLogger.__instance.get(logger_name)
+        listener = getattr(local_instance, "queue_listener", None)
+        if listener is None:
+            return
+
+        local_instance.handlers = [handler for handler in local_instance.handlers
+                                   if getattr(handler, "queue", None) is not local_instance.overflow_queue]
+        local_instance.handlers += listener.handlers
+        local_instance.overflow_queue.close()
+        if listener._thread is not None:
+            listener.stop()
+        local_instance.queue_listener = None
+
+    @classmethod
+    def get_profile_report(cls,
+                           logger_name: str = None,
+                           top: int = 10) -> str:
+        """
+        Report the call sites with the most calls, time, bytes and dropped records.
+
+        Args:
+            top (int, optional): The number of call sites in each section.
+
+        Returns:
+            str: The report, or None if the logger was not created with 'profile'.
+        """
+        if logger_name is None or logger_name not in PseudoSingletonLogger.__instance:
+            _local_logger = PseudoSingletonLogger.__last_instance
+        else:
+            _local_logger = PseudoSingletonLogger.__instance[logger_name]
+
+        if getattr(_local_logger, "profiler", None) is None:
+            return None
+        return _local_logger.profiler.report(top=top)
+
     @classmethod
     @property
     def version(self):
@@ -336,6 +501,21 @@ class LoggerWrapper(logging.Logger):
         handlers (list, optional): List of handlers to add to the logger.
         Defaults to [StreamHnadler].
 
+        queue_size (int, optional): Size of the OverflowQueue placed in front
+        of the handlers.
+        Defaults to None (no queue).
+
+        overflow (str, optional): The overflow policy of the queue.
+        Defaults to 'block'.
+
+        overflow_timeout (float, optional): Seconds the 'block' policy waits
+        before dropping.
+        Defaults to None (wait forever).
+
+        profile (bool, optional): Whether to measure the logging cost per
+        call site.
+        Defaults to False.
+
     Returns:
         logging.Logger: A configured Logger instance.
     """
@@ -347,7 +527,11 @@ class LoggerWrapper(logging.Logger):
                  level: int = logging.DEBUG,
                  meta: bool = True,
                  date_filename: bool = True,
-                 handlers=None):
+                 handlers=None,
+                 queue_size: int = None,
+                 overflow: str = "block",
+                 overflow_timeout: float = None,
+                 profile: bool = False):
 
         super().__init__(name, level=level)
         if instance_name is None:
@@ -362,12 +546,20 @@ class LoggerWrapper(logging.Logger):
                                             level=level,
                                             meta=meta,
                                             date_filename=date_filename,
-                                            handlers=handlers)
+                                            handlers=handlers,
+                                            queue_size=queue_size,
+                                            overflow=overflow,
+                                            overflow_timeout=overflow_timeout,
+                                            profile=profile)
 
         self.get_output_path = self.logger.get_output_path
         self.remove_handler = self.logger.remove_handler
         self.version = self.logger.version
         self.set_default_format = self.logger.set_default_format
+        self.stop_queue = functools.partial(self.logger.stop_queue,
+                                            logger_name=self.logger.logger_name)
+        self.get_profile_report = functools.partial(self.logger.get_profile_report,
+                                                    logger_name=self.logger.logger_name)
 
     def change_instance_name(self, instance_name: str):
         """
@@ -399,6 +591,8 @@ class LoggerWrapper(logging.Logger):
 
 
 if __name__ == "__main__":
+    from pathlib import Path
+
     log_path = Path(".logs", "test.log")
     if not log_path.parent.exists():
         log_path.parent.mkdir(parents=True, exist_ok=True)
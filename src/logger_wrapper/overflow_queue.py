@@ -0,0 +1,263 @@
+#!/bin/python3
+"""
+ **[OverflowQueue]**
+
+A bounded queue to place in front of the PseudoSingletonLogger handlers.
+
+When the handlers cannot keep up with the log volume the queue applies one
+of the overflow policies instead of growing without a bound:
+
+    *block:*        Wait (up to 'timeout' seconds) for room, then drop the new record.
+    *drop_newest:*  Drop the record being added.
+    *drop_oldest:*  Drop the oldest buffered record.
+    *drop_lowest:*  Drop the oldest record of the lowest buffered severity.
+                    ERROR/CRITICAL records are kept while DEBUG/INFO are shed.
+
+Records are kept in one sub-queue per standard level, so shedding only looks
+at the head of each sub-queue and never scans the buffer.
+Dropped records are counted per level name and a WARNING summary record is
+handed to the consumer once the queue has room again.
+A closed queue refuses the new records, counting them as dropped, and never
+blocks.
+
+The queue implements the subset of the queue.Queue interface used by
+logging.handlers.QueueHandler and logging.handlers.QueueListener.
+
+    Copyright (c)  2023.  Erol Yesin/Sandboxzilla
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+    IN THE SOFTWARE.
+"""
+import bisect
+import collections
+import itertools
+import logging
+import queue
+import threading
+from logging import handlers as hdls
+
+BLOCK = "block"
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+DROP_LOWEST = "drop_lowest"
+OVERFLOW_POLICIES = (BLOCK, DROP_NEWEST, DROP_OLDEST, DROP_LOWEST)
+
+_LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+
+
+def _level_index(levelno: int) -> int:
+    """Map a level number to its sub-queue.  Custom levels share the sub-queue of the level below."""
+    return max(bisect.bisect_right(_LEVELS, levelno) - 1, 0)
+
+
+class OverflowQueue:
+    """
+    Bounded, priority aware queue of log records.
+
+    Args (all optional):
+        maxsize (int): The maximum number of buffered records.
+        policy (str): One of OVERFLOW_POLICIES.
+        timeout (float): Seconds to wait for room under the 'block' policy.
+                         None waits forever.
+        on_drop (callable): Called with every dropped record.
+        name (str): The logger name used for the drop summary records.
+    """
+
+    def __init__(self,
+                 maxsize: int = 1000,
+                 policy: str = BLOCK,
+                 timeout: float = None,
+                 on_drop=None,
+                 name: str = "root"):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}', expected one of {OVERFLOW_POLICIES}")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.timeout = timeout
+        self.on_drop = on_drop
+        self.name = name
+
+        self.dropped = collections.Counter()
+        self._unreported = collections.Counter()
+        self._levels = tuple(collections.deque() for _ in _LEVELS)
+        # Non-record items (e.g. the QueueListener sentinel) are never counted nor dropped.
+        self._control = collections.deque()
+        self._size = 0
+        self._closed = False
+        self._seq = itertools.count()
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """
+        Add an item to the queue applying the overflow policy when full.
+
+        Args:
+            item (logging.LogRecord): The record to add.
+            block (bool, optional): Whether the 'block' policy may wait for room.
+                                    When False a full queue drops the new record.
+            timeout (float, optional): Overrides the queue timeout for this call.
+        """
+        victim = None
+        with self._mutex:
+            if not isinstance(item, logging.LogRecord):
+                self._control.append((next(self._seq), item))
+                self._not_empty.notify()
+                return
+
+            if self._closed:
+                victim = item
+            elif self._size >= self.maxsize:
+                if self.policy == BLOCK and block:
+                    if timeout is None:
+                        timeout = self.timeout
+                    if (not self._not_full.wait_for(lambda: self._size < self.maxsize or self._closed, timeout)
+                            or self._closed):
+                        victim = item
+                elif self.policy == DROP_OLDEST:
+                    victim = self._pop_oldest()
+                elif self.policy == DROP_LOWEST:
+                    victim = self._pop_lowest(item)
+                else:
+                    victim = item
+
+            if victim is not None:
+                self.dropped[victim.levelname] += 1
+                self._unreported[victim.levelname] += 1
+
+            if victim is not item:
+                self._levels[_level_index(item.levelno)].append((next(self._seq), item))
+                self._size += 1
+                self._not_empty.notify()
+
+        if victim is not None and self.on_drop is not None:
+            self.on_drop(victim)
+
+    def close(self):
+        """
+        Refuse the records put from now on, counting them as dropped, and wake
+        the producers waiting for room.  The buffered records can still be read.
+        """
+        with self._mutex:
+            self._closed = True
+            self._not_full.notify_all()
+
+    def put_nowait(self, item):
+        """Add an item without waiting for room."""
+        self.put(item, block=False)
+
+    def get(self, block: bool = True, timeout: float = None):
+        """
+        Remove and return the oldest item.
+
+        Once the queue has room again after an overflow, a WARNING record
+        summarizing the dropped records is returned ahead of the next item.
+
+        Raises:
+            queue.Empty: If no item is available within the timeout.
+        """
+        with self._mutex:
+            if self._unreported and self._size < self.maxsize:
+                return self._drop_summary()
+
+            if not block:
+                if not self._size and not self._control:
+                    raise queue.Empty
+            elif not self._not_empty.wait_for(lambda: self._size or self._control, timeout):
+                raise queue.Empty
+
+            sub_queue = self._oldest_sub_queue(include_control=True)
+            _, item = sub_queue.popleft()
+            if sub_queue is not self._control:
+                self._size -= 1
+                self._not_full.notify()
+            return item
+
+    def get_nowait(self):
+        """Remove and return the oldest item without waiting."""
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        """The number of buffered records."""
+        return self._size
+
+    def empty(self) -> bool:
+        """True if no records are buffered."""
+        return self._size == 0
+
+    def full(self) -> bool:
+        """True if the next record will trigger the overflow policy."""
+        return self._size >= self.maxsize
+
+    def drop_counts(self) -> dict:
+        """
+        The number of dropped records per level name since the queue was created.
+
+        Returns:
+            dict: {level name: count}
+        """
+        with self._mutex:
+            return dict(self.dropped)
+
+    def _oldest_sub_queue(self, include_control: bool = False):
+        """Return the non-empty sub-queue holding the oldest item."""
+        candidates = self._levels + (self._control,) if include_control else self._levels
+        oldest = None
+        for sub_queue in candidates:
+            if sub_queue and (oldest is None or sub_queue[0][0] < oldest[0][0]):
+                oldest = sub_queue
+        return oldest
+
+    def _pop_oldest(self) -> logging.LogRecord:
+        _, record = self._oldest_sub_queue().popleft()
+        self._size -= 1
+        return record
+
+    def _pop_lowest(self, incoming: logging.LogRecord) -> logging.LogRecord:
+        incoming_index = _level_index(incoming.levelno)
+        for index, sub_queue in enumerate(self._levels):
+            if sub_queue:
+                if incoming_index < index:
+                    return incoming
+                _, record = sub_queue.popleft()
+                self._size -= 1
+                return record
+        return incoming
+
+    def _drop_summary(self) -> logging.LogRecord:
+        counts = ", ".join(f"{level}={count}" for level, count in sorted(self._unreported.items()))
+        total = sum(self._unreported.values())
+        self._unreported.clear()
+        return logging.makeLogRecord({"name": self.name,
+                                      "levelno": logging.WARNING,
+                                      "levelname": logging.getLevelName(logging.WARNING),
+                                      "msg": f"{self.__class__.__name__} dropped {total} records ({counts})",
+                                      "instanceName": self.__class__.__name__})
+
+
+class OverflowQueueHandler(hdls.QueueHandler):
+    """
+    A QueueHandler that lets the OverflowQueue decide between blocking and dropping.
+
+    The stock QueueHandler always calls put_nowait, which would turn the
+    'block' policy into 'drop_newest'.
+    """
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put(record)
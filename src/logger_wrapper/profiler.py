@@ -0,0 +1,189 @@
+#!/bin/python3
+"""
+ **[CallSiteProfiler]**
+
+An opt-in profiler that tells which logging call sites cost the most.
+
+For every record it measures, per call site (file, line, function) and
+instance name:
+
+    *calls:*    the number of records.
+    *time:*     the wall time spent handling the record (filters, formatting
+                and handlers), measured with time.perf_counter_ns.  The span
+                starts at Logger.handle, so findCaller and makeRecord are
+                not counted.
+    *bytes:*    the UTF-8 size of the rendered message.
+    *dropped:*  the records dropped by an OverflowQueue, per level name.
+
+Each thread updates its own table, so the logging threads never contend on
+a lock; the tables are only merged when a report is asked for.
+
+**Example Usage::**
+
+<code >
+log = LoggerWrapper(name="app", profile=True)
+...
+print(log.get_profile_report(top=5))
+< / code >
+
+    Copyright (c)  2023.  Erol Yesin/Sandboxzilla
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+    IN THE SOFTWARE.
+"""
+import collections
+import functools
+import logging
+import os
+import threading
+import time
+
+# Positions in the per call site counter lists.
+_CALLS, _TIME, _BYTES, _DROPPED = range(4)
+
+_REPORTS = (("calls", "Most calls"),
+            ("time_ns", "Most time"),
+            ("bytes", "Most bytes"),
+            ("dropped_total", "Most dropped"))
+
+
+class CallSiteProfiler:
+    """
+    Per call site counters of the logging cost, kept in per thread tables.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._tables = []
+        self._tables_lock = threading.Lock()
+
+    def _table(self) -> dict:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = self._local.table = {}
+            with self._tables_lock:
+                self._tables.append(table)
+        return table
+
+    def _counters(self, record: logging.LogRecord) -> list:
+        key = (record.pathname, record.lineno, record.funcName, getattr(record, "instanceName", ""))
+        table = self._table()
+        counters = table.get(key)
+        if counters is None:
+            counters = table[key] = [0, 0, 0, None]
+        return counters
+
+    def wrap(self, handle):
+        """
+        Wrap a Logger.handle method so each handled record is measured.
+
+        Args:
+            handle (callable): The bound handle method of the logger.
+
+        Returns:
+            callable: The measuring replacement.
+        """
+        @functools.wraps(handle)
+        def profiled_handle(record: logging.LogRecord):
+            start = time.perf_counter_ns()
+            handle(record)
+            elapsed = time.perf_counter_ns() - start
+            message = getattr(record, "message", None)
+            if message is None:
+                # No handler formatted the record, or its arguments did not fit the message.
+                try:
+                    message = record.getMessage()
+                except Exception:  # pylint: disable=broad-except
+                    message = str(record.msg)
+            counters = self._counters(record)
+            counters[_CALLS] += 1
+            counters[_TIME] += elapsed
+            counters[_BYTES] += len(message.encode("utf-8", "backslashreplace"))
+
+        return profiled_handle
+
+    def drop(self, record: logging.LogRecord):
+        """
+        Count a dropped record against its call site.  Used as the OverflowQueue on_drop callback.
+        """
+        counters = self._counters(record)
+        if counters[_DROPPED] is None:
+            counters[_DROPPED] = collections.Counter()
+        counters[_DROPPED][record.levelname] += 1
+
+    def reset(self):
+        """Clear the counters of all threads."""
+        with self._tables_lock:
+            for table in self._tables:
+                table.clear()
+
+    def stats(self) -> list[dict]:
+        """
+        Merge the per thread tables.
+
+        Returns:
+            list[dict]: One dict per call site with the keys 'location', 'instance',
+                        'calls', 'time_ns', 'bytes', 'dropped' and 'dropped_total'.
+        """
+        merged = {}
+        with self._tables_lock:
+            tables = [table.copy() for table in self._tables]
+        for table in tables:
+            for (pathname, lineno, func_name, instance), counters in table.items():
+                key = (pathname, lineno, func_name, instance)
+                site = merged.get(key)
+                if site is None:
+                    site = merged[key] = {"location": f"{os.path.basename(pathname or '')}:{lineno}:{func_name}",
+                                          "instance": instance,
+                                          "calls": 0,
+                                          "time_ns": 0,
+                                          "bytes": 0,
+                                          "dropped": collections.Counter()}
+                site["calls"] += counters[_CALLS]
+                site["time_ns"] += counters[_TIME]
+                site["bytes"] += counters[_BYTES]
+                if counters[_DROPPED] is not None:
+                    site["dropped"].update(counters[_DROPPED])
+        for site in merged.values():
+            site["dropped"] = dict(site["dropped"])
+            site["dropped_total"] = sum(site["dropped"].values())
+        return list(merged.values())
+
+    def report(self, top: int = 10) -> str:
+        """
+        The top-N call sites by calls, time, bytes and dropped records.
+
+        Args:
+            top (int, optional): The number of call sites in each section.
+
+        Returns:
+            str: The report text.
+        """
+        sites = self.stats()
+        lines = []
+        for key, title in _REPORTS:
+            ranked = sorted((site for site in sites if site[key]), key=lambda site: site[key], reverse=True)
+            lines.append(f"{title}:")
+            if not ranked:
+                lines.append("    -")
+            for site in ranked[:top]:
+                instance = f" [{site['instance']}]" if site["instance"] else ""
+                dropped = ", ".join(f"{level}={count}" for level, count in sorted(site["dropped"].items()))
+                lines.append(f"    {site['location']}{instance}: "
+                             f"calls={site['calls']} "
+                             f"time={site['time_ns'] / 1e6:.3f}ms "
+                             f"bytes={site['bytes']}" +
+                             (f" dropped=({dropped})" if dropped else ""))
+        return "\n".join(lines)
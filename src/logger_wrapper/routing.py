@@ -0,0 +1,236 @@
+#!/bin/python3
+"""
+ **[RoutingHandler]**
+
+A handler that splits the log records between outputs by level, logger name
+and instance name.
+
+The routes are declared once and compiled into a dispatch table.  The tuple
+of target handlers is resolved the first time a (level, logger name,
+instanceName) key is seen and cached, so every following record costs one
+dict lookup instead of running a filter chain on every handler.  The cache
+holds at most 'max_cache' keys and is cleared when full, so instance names
+made up at run time cost a new resolution instead of memory.
+
+A route target is either a logging.Handler or a file name.  File names are
+opened by a LazyFileHandler on the first record routed to them, so routes
+that never fire never create a file.
+
+**Example Usage::**
+
+<code >
+routes = [Route("logs/errors.log", level=logging.ERROR),
+          Route("logs/db.log", instance="db*"),
+          Route("logs/all.log")]
+log = LoggerWrapper(name="app",
+                    handlers=[RoutingHandler(routes)],
+                    date_filename=False)
+< / code >
+
+    Copyright (c)  2023.  Erol Yesin/Sandboxzilla
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+    IN THE SOFTWARE.
+"""
+import fnmatch
+import logging
+import os
+
+try:
+    from .logger_wrapper import LazyFileHandler
+except ImportError:
+    from logger_wrapper import LazyFileHandler
+
+
+def _level_number(level) -> int:
+    """Accept a level number or a level name."""
+    if isinstance(level, str):
+        return logging.getLevelNamesMapping()[level.upper()]
+    return level
+
+
+class Route:
+    """
+    One entry of the routing table.
+
+    Args:
+        target (logging.Handler | str): The handler, or the file name, receiving the records.
+
+    Args (all optional):
+        level (int | str): The lowest level routed to the target.
+        max_level (int | str): The highest level routed to the target.
+        logger (str): A fnmatch pattern for the logger name.
+        instance (str): A fnmatch pattern for the instanceName.
+                        Records without an instance name match as ''.
+    """
+
+    def __init__(self,
+                 target,
+                 level=logging.NOTSET,
+                 max_level=None,
+                 logger: str = "*",
+                 instance: str = "*"):
+        self.target = target
+        self.level = _level_number(level)
+        self.max_level = None if max_level is None else _level_number(max_level)
+        self.logger = logger
+        self.instance = instance
+
+    def matches(self, levelno: int, logger_name: str, instance_name: str) -> bool:
+        """True if a record with the given key is routed to the target."""
+        if levelno < self.level:
+            return False
+        if self.max_level is not None and levelno > self.max_level:
+            return False
+        return (fnmatch.fnmatchcase(logger_name, self.logger) and
+                fnmatch.fnmatchcase(instance_name, self.instance))
+
+    def __repr__(self):
+        return (f"Route({self.target!r}, level={self.level}, max_level={self.max_level}, "
+                f"logger={self.logger!r}, instance={self.instance!r})")
+
+
+class RoutingHandler(logging.Handler):
+    """
+    Dispatch the records to the targets of the matching routes.
+
+    Args:
+        routes (list[Route | dict]): The routing table.  A dict is passed to Route as keywords.
+
+    Args (all optional):
+        level (int): The level of the routing handler itself.
+        mode (str): The mode used to open the file targets.
+        encoding (str): The encoding used to open the file targets.
+        max_cache (int): The number of keys kept in the dispatch cache before it is cleared.
+    """
+
+    def __init__(self,
+                 routes,
+                 level: int = logging.NOTSET,
+                 mode: str = 'a',
+                 encoding: str = None,
+                 max_cache: int = 4096):
+        super().__init__(level=level)
+        self.mode = mode
+        self.encoding = encoding
+        self.max_cache = max_cache
+        self.routes = []
+        self._targets = []
+        self._owned = set()
+        self._inherit_format = set()
+        self._files = {}
+        self._dispatch = {}
+        for route in routes:
+            self.add_route(route)
+
+    def add_route(self, route):
+        """
+        Append a route to the table and drop the cached dispatch entries.
+
+        Args:
+            route (Route | dict): The route to add.
+        """
+        if isinstance(route, dict):
+            route = Route(**route)
+
+        with self.lock:
+            target = route.target
+            if not isinstance(target, logging.Handler):
+                filename = os.path.abspath(os.fspath(target))
+                if filename not in self._files:
+                    self._files[filename] = LazyFileHandler(filename, mode=self.mode, encoding=self.encoding)
+                    self._owned.add(self._files[filename])
+                    self._inherit_format.add(self._files[filename])
+                    if self.formatter is not None:
+                        self._files[filename].setFormatter(self.formatter)
+                target = self._files[filename]
+
+            self.routes.append(route)
+            self._targets.append(target)
+            self._dispatch = {}
+
+    def resolve(self, levelno: int, logger_name: str, instance_name: str = "") -> tuple:
+        """
+        Return the handlers receiving records with the given key.
+
+        Returns:
+            tuple[logging.Handler]: The cached handler tuple, without duplicates.
+        """
+        key = (levelno, logger_name, instance_name)
+        handlers = self._dispatch.get(key)
+        if handlers is None:
+            # Resolved under the lock, so a concurrent add_route cannot be
+            # missed by an entry stored in its new table.
+            with self.lock:
+                dispatch = self._dispatch
+                handlers = dispatch.get(key)
+                if handlers is None:
+                    handlers = []
+                    for route, target in zip(self.routes, self._targets):
+                        if target not in handlers and route.matches(levelno, logger_name, instance_name):
+                            handlers.append(target)
+                    handlers = tuple(handlers)
+                    if len(dispatch) >= self.max_cache:
+                        dispatch.clear()
+                    dispatch[key] = handlers
+        return handlers
+
+    def handle(self, record: logging.LogRecord):
+        # The targets take their own locks, holding ours would serialize every route.
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record: logging.LogRecord):
+        for handler in self.resolve(record.levelno,
+                                    record.name,
+                                    getattr(record, "instanceName", "")):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def setFormatter(self, fmt: logging.Formatter):
+        """Set the formatter on the routing handler and on the targets without their own formatter."""
+        super().setFormatter(fmt)
+        for target in set(self._targets):
+            if target in self._inherit_format or target.formatter is None:
+                target.setFormatter(fmt)
+                self._inherit_format.add(target)
+
+    def get_output_path(self) -> list[str]:
+        """
+        The output targets of the routes.
+
+        Returns:
+            list[str]: File names for the file handlers, stream names for the stream handlers.
+        """
+        paths = []
+        for target in dict.fromkeys(self._targets):
+            if isinstance(target, logging.FileHandler):
+                paths.append(target.baseFilename)
+            elif isinstance(target, logging.StreamHandler):
+                paths.append(str(getattr(target.stream, "name", target.stream)))
+        return paths
+
+    def flush(self):
+        for target in set(self._targets):
+            target.flush()
+
+    def close(self):
+        for target in self._owned:
+            target.close()
+        super().close()
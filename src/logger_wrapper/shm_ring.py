@@ -0,0 +1,440 @@
+#!/bin/python3
+"""
+ **[SharedMemoryRing]**
+
+A same-host transport that moves log records between processes through a
+multiprocessing.shared_memory ring buffer instead of a pickling pipe.
+
+The producers log through a SharedMemoryHandler, which encodes each record
+as a compact fixed header followed by the payload bytes::
+
+    timestamp (f64), level (u16), line number (u32), pid (u32), thread id (u64),
+    lengths of the logger name, thread name, module, function name,
+    instance name (u16 each) and of the message (u32)
+
+The consumer, a SharedMemoryListener thread running in the process that
+owns the real handlers, decodes the records and hands them to the handlers.
+It polls the ring, backing off up to its poll_interval while the ring is empty.
+
+The ring keeps monotonic head/tail byte counters in a small control block.
+Frames are 8 byte aligned and wrap around the end of the buffer.  When the
+buffer is full a producer waits up to 'timeout' seconds for the consumer and
+then drops the record; the drops are counted in the control block.
+One producer needs no lock (single_producer=True), several producers share
+a multiprocessing.Lock.
+
+**Example Usage::**
+
+<code >
+ring = SharedMemoryRing(capacity=1 << 20)
+listener = SharedMemoryListener(ring, *PseudoSingletonLogger(name="writer",
+                                                             handlers=handlers).handlers)
+listener.start()
+
+# In each worker process, given the ring as a Process argument:
+log = PseudoSingletonLogger(name="worker", handlers=[SharedMemoryHandler(ring)])
+
+listener.stop()
+ring.close()
+ring.unlink()
+< / code >
+
+    Copyright (c)  2023.  Erol Yesin/Sandboxzilla
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+    IN THE SOFTWARE.
+"""
+import contextlib
+import logging
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+from logging import handlers as hdls
+from multiprocessing import shared_memory
+
+# head, tail, dropped, capacity
+_CONTROL = struct.Struct("<QQQQ")
+_CONTROL_SIZE = 64
+_POSITIONS = struct.Struct("<QQ")
+_COUNTER = struct.Struct("<Q")
+_HEAD, _TAIL, _DROPPED = 0, 8, 16
+_FRAME = struct.Struct("<I")
+_ALIGN = 8
+
+# timestamp, level, lineno, pid, thread id, then the lengths of
+# name, threadName, module, funcName, instanceName and message.
+_HEADER = struct.Struct("<dHIIQHHHHHI")
+_U16_MAX = 0xFFFF
+
+_MESSAGE_FORMATTER = logging.Formatter()
+
+# Used instead of the lock by a single producer.
+_NO_LOCK = contextlib.nullcontext()
+
+# The encoded name, threadName, module, funcName and instanceName, by their
+# text.  Cleared when full, since thread and instance names can be dynamic.
+_FIELDS = {}
+_FIELDS_MAX = 1024
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGN - 1) & ~(_ALIGN - 1)
+
+
+def _with_traceback(record: logging.LogRecord, message: str) -> str:
+    """Append the exception and stack text to the message, as logging.Formatter.format does."""
+    if record.exc_info and not record.exc_text:
+        # Cached on the record, as the Formatter does, for the other handlers.
+        record.exc_text = _MESSAGE_FORMATTER.formatException(record.exc_info)
+    if record.exc_text:
+        if message[-1:] != "\n":
+            message += "\n"
+        message += record.exc_text
+    if record.stack_info:
+        if message[-1:] != "\n":
+            message += "\n"
+        message += _MESSAGE_FORMATTER.formatStack(record.stack_info)
+    return message
+
+
+def _encode_fields(key: tuple) -> tuple:
+    """Encode the short fields of a record, each cut to its u16 length slot."""
+    fields = [(text or "").encode("utf-8", "backslashreplace")[:_U16_MAX] for text in key]
+    if len(_FIELDS) >= _FIELDS_MAX:
+        _FIELDS.clear()
+    encoded = _FIELDS[key] = (tuple(len(field) for field in fields), b"".join(fields))
+    return encoded
+
+
+def encode_record(record: logging.LogRecord) -> bytes:
+    """
+    Encode a log record as the fixed header followed by the payload.
+
+    The message is rendered with its arguments, exception and stack text,
+    so the consumer never needs to unpickle user objects.
+
+    Returns:
+        bytes: The encoded record.
+    """
+    # This runs on every logging call of the producers, only the message is
+    # encoded each time.
+    message = record.getMessage()
+    if record.exc_info or record.exc_text or record.stack_info:
+        message = _with_traceback(record, message)
+    message = message.encode("utf-8", "backslashreplace")
+    key = (record.name, record.threadName, record.module, record.funcName, getattr(record, "instanceName", None))
+    lengths, fields = _FIELDS.get(key) or _encode_fields(key)
+    return b"".join((_HEADER.pack(record.created,
+                                  record.levelno,
+                                  record.lineno or 0,
+                                  record.process or 0,
+                                  record.thread or 0,
+                                  *lengths,
+                                  len(message)),
+                     fields,
+                     message))
+
+
+def decode_record(data) -> logging.LogRecord:
+    """
+    Rebuild a log record from the bytes produced by encode_record.
+
+    Returns:
+        logging.LogRecord: A record carrying the fields needed by the PseudoSingletonLogger formats.
+    """
+    (created, levelno, lineno, pid, thread_id, *lengths) = _HEADER.unpack_from(data, 0)
+    fields = []
+    offset = _HEADER.size
+    for length in lengths:
+        fields.append(bytes(data[offset:offset + length]).decode("utf-8", "replace"))
+        offset += length
+    name, thread_name, module, func_name, instance_name, message = fields
+
+    record = logging.makeLogRecord({"name": name,
+                                    "levelno": levelno,
+                                    "levelname": logging.getLevelName(levelno),
+                                    "lineno": lineno,
+                                    "process": pid,
+                                    "thread": thread_id,
+                                    "threadName": thread_name,
+                                    "module": module,
+                                    "funcName": func_name,
+                                    "instanceName": instance_name,
+                                    "msg": message})
+    record.relativeCreated += (created - record.created) * 1000
+    record.created = created
+    record.msecs = int((created - int(created)) * 1000) + 0.0
+    return record
+
+
+class SharedMemoryRing:
+    """
+    A byte ring buffer in a multiprocessing.shared_memory block.
+
+    Args (all optional):
+        name (str): The shared memory name.  Generated when creating.
+        capacity (int): The size of the data area in bytes, rounded up to 8.
+        create (bool): Create the block, otherwise attach to an existing one.
+        lock (multiprocessing.Lock): Serializes the producers.  A new lock is created
+                                     when creating, pass one from the context of the
+                                     processes when they are not started with the default
+                                     start method.
+        single_producer (bool): Skip the lock: only one process writes to the ring,
+                                through a single SharedMemoryHandler (its handler lock
+                                serializes the threads of that process).
+        timeout (float): Seconds a producer waits for room before dropping.
+                         float("inf") never drops.
+        poll_interval (float): Seconds between checks while waiting.
+    """
+
+    def __init__(self,
+                 name: str = None,
+                 capacity: int = 1 << 20,
+                 create: bool = True,
+                 lock=None,
+                 single_producer: bool = False,
+                 timeout: float = 0.0,
+                 poll_interval: float = 0.0005):
+        if single_producer and lock is not None:
+            raise ValueError("a single producer ring takes no lock")
+        if create:
+            capacity = _aligned(capacity)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=_CONTROL_SIZE + capacity)
+            _CONTROL.pack_into(self.shm.buf, 0, 0, 0, 0, capacity)
+            if lock is None and not single_producer:
+                lock = multiprocessing.Lock()
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        # The same memoryview as shm.buf, released by shm.close().
+        self._buf = self.shm.buf
+        self.capacity = _CONTROL.unpack_from(self._buf, 0)[3]
+        self.lock = lock
+        self.single_producer = single_producer
+        self._lock = _NO_LOCK if lock is None else lock
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # The consumer sleep, backed off while the ring stays empty.
+        self._idle_interval = poll_interval
+
+    def __getstate__(self):
+        return {"name": self.name,
+                "lock": self.lock,
+                "single_producer": self.single_producer,
+                "timeout": self.timeout,
+                "poll_interval": self.poll_interval}
+
+    def __setstate__(self, state):
+        self.__init__(create=False, **state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def name(self) -> str:
+        """The shared memory name, used to attach from other processes."""
+        return self.shm.name
+
+    @property
+    def dropped(self) -> int:
+        """The number of records dropped because the buffer was full."""
+        return _COUNTER.unpack_from(self._buf, _DROPPED)[0]
+
+    def qsize(self) -> int:
+        """The number of buffered bytes, frames and padding included."""
+        head, tail = _POSITIONS.unpack_from(self._buf, _HEAD)
+        return head - tail
+
+    def empty(self) -> bool:
+        """True if there is nothing to read."""
+        return self.qsize() == 0
+
+    def put(self, data: bytes, timeout: float = None) -> bool:
+        """
+        Append one frame to the ring.
+
+        Args:
+            data (bytes): The frame payload.
+            timeout (float, optional): Overrides the ring timeout for this call.
+
+        Returns:
+            bool: False if the frame was dropped.
+        """
+        frame_size = _aligned(_FRAME.size + len(data))
+        if timeout is None:
+            timeout = self.timeout
+
+        buf = self._buf
+        capacity = self.capacity
+        with self._lock:
+            deadline = None
+            while True:
+                head, tail = _POSITIONS.unpack_from(buf, _HEAD)
+                if frame_size <= capacity - (head - tail):
+                    break
+                if deadline is None:
+                    deadline = time.monotonic() + timeout
+                if frame_size > capacity or time.monotonic() >= deadline:
+                    _COUNTER.pack_into(buf, _DROPPED, self.dropped + 1)
+                    return False
+                time.sleep(self.poll_interval)
+
+            offset = head % capacity
+            _FRAME.pack_into(buf, _CONTROL_SIZE + offset, len(data))
+            start = _CONTROL_SIZE + offset + _FRAME.size
+            # The frames are 8 byte aligned, so the length prefix never wraps.
+            if offset + _FRAME.size + len(data) <= capacity:
+                buf[start:start + len(data)] = data
+            else:
+                self._write(head + _FRAME.size, data)
+            # Publish the frame only once it is complete.
+            _COUNTER.pack_into(buf, _HEAD, head + frame_size)
+        return True
+
+    def get(self, timeout: float = 0.0, max_interval: float = None):
+        """
+        Remove and return one frame.  Only one consumer may call get.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a frame.
+            max_interval (float, optional): The longest sleep between checks.  While the ring
+                                            stays empty the sleep doubles from poll_interval up
+                                            to it, across calls, and a frame resets it.
+                                            None always sleeps poll_interval.
+
+        Returns:
+            bytes: The frame payload, None if nothing arrived in time.
+        """
+        buf = self._buf
+        deadline = None
+        while True:
+            head, tail = _POSITIONS.unpack_from(buf, _HEAD)
+            if head != tail:
+                self._idle_interval = self.poll_interval
+                break
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + timeout
+            if now >= deadline:
+                return None
+            interval = self._idle_interval if max_interval is not None else self.poll_interval
+            time.sleep(min(interval, deadline - now))
+            if max_interval is not None:
+                self._idle_interval = min(interval * 2, max_interval)
+
+        length = _FRAME.unpack_from(buf, _CONTROL_SIZE + tail % self.capacity)[0]
+        data = self._read(tail + _FRAME.size, length)
+        _COUNTER.pack_into(buf, _TAIL, tail + _aligned(_FRAME.size + length))
+        return data
+
+    def close(self):
+        """Detach from the shared memory."""
+        self._buf = None
+        self.shm.close()
+
+    def unlink(self):
+        """Free the shared memory.  Called once, by the creator."""
+        self.shm.unlink()
+
+    def _write(self, position: int, data: bytes):
+        offset = position % self.capacity
+        first = min(len(data), self.capacity - offset)
+        start = _CONTROL_SIZE + offset
+        self.shm.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self.shm.buf[_CONTROL_SIZE:_CONTROL_SIZE + len(data) - first] = data[first:]
+
+    def _read(self, position: int, length: int) -> bytes:
+        offset = position % self.capacity
+        first = min(length, self.capacity - offset)
+        start = _CONTROL_SIZE + offset
+        data = bytes(self.shm.buf[start:start + first])
+        if first < length:
+            data += bytes(self.shm.buf[_CONTROL_SIZE:_CONTROL_SIZE + length - first])
+        return data
+
+
+class SharedMemoryHandler(logging.Handler):
+    """
+    A handler that writes the encoded records to a SharedMemoryRing.
+
+    The handler formatter is not used, the consumer handlers do the formatting.
+
+    Args:
+        ring (SharedMemoryRing): The ring shared with the consumer.
+
+    Args (all optional):
+        level (int): The level of the handler.
+        timeout (float): Overrides the ring timeout.
+    """
+
+    def __init__(self, ring: SharedMemoryRing, level: int = logging.NOTSET, timeout: float = None):
+        super().__init__(level=level)
+        self.ring = ring
+        self.timeout = timeout
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.ring.put(encode_record(record), timeout=self.timeout)
+        except Exception:
+            self.handleError(record)
+
+    def get_output_path(self) -> list[str]:
+        """The shared memory the records are written to."""
+        return [f"<shm:{self.ring.name}>"]
+
+
+class SharedMemoryListener(hdls.QueueListener):
+    """
+    Drain a SharedMemoryRing into the given handlers from a background thread.
+
+    Args:
+        ring (SharedMemoryRing): The ring to drain.
+        handlers (logging.Handler): The handlers receiving the records.
+
+    Args (all optional):
+        respect_handler_level (bool): Skip the handlers whose level is above the record level.
+        poll_interval (float): Seconds to wait for a record before checking for stop, and the
+                               longest sleep of the ring polling while it stays empty.
+    """
+
+    def __init__(self, ring: SharedMemoryRing, *handlers,
+                 respect_handler_level: bool = False,
+                 poll_interval: float = 0.05):
+        super().__init__(ring, *handlers, respect_handler_level=respect_handler_level)
+        self.poll_interval = poll_interval
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._stopping.clear()
+        super().start()
+
+    def dequeue(self, block: bool):
+        while True:
+            data = self.queue.get(timeout=self.poll_interval if block else 0.0, max_interval=self.poll_interval)
+            if data is not None:
+                return decode_record(data)
+            # The ring is drained before the listener stops.
+            if self._stopping.is_set():
+                return self._sentinel
+            if not block:
+                raise queue.Empty
+
+    def enqueue_sentinel(self):
+        self._stopping.set()
@@ -0,0 +1,301 @@
+#!/bin/python3
+
+#
+#  Copyright (c) 2023  Erol Yesin/SandboxZilla
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import contextlib
+import io
+import json
+import logging
+import os
+import queue
+import unittest
+from pathlib import Path
+import tempfile
+
+
+src_dir = Path(str(Path.cwd().parent),
+               'logger-wrapper',
+               'src',
+               'logger_wrapper')
+os.sys.path.insert(0, str(src_dir))
+
+import loadgen
+
+
+SAMPLE_LOG = """\
+2023-05-03 23:15:41,123,LoggerWrapper Demo,[INFO:pid=3356970:MainThread:log1:logger_wrapper:<module>:408],test of 0
+2023-05-03 23:15:41,373,LoggerWrapper Demo,[ERROR:pid=3356970:MainThread:log2:logger_wrapper:<module>:409],failed
+Traceback (most recent call last):
+  File "demo.py", line 1, in <module>
+RuntimeError: boom
+2023-05-03 23:15:42,123,[DEBUG:pid=3356970:MainThread:log1:logger_wrapper:<module>:408],0123456789
+"""
+
+CAPTURED = []
+
+
+class CaptureHandler(logging.Handler):
+    """Keeps the formatted records, to check what a --handlers factory received."""
+
+    def emit(self, record):
+        CAPTURED.append(self.format(record))
+
+
+def capture_handlers():
+    """A --handlers factory."""
+    return [CaptureHandler()]
+
+
+def bad_handlers():
+    """A --handlers factory not returning handlers."""
+    return ["not a handler"]
+
+
+def exiting_handlers():
+    """A --handlers factory killing the worker process before it reports."""
+    os._exit(3)
+
+
+class LoadGenTests(unittest.TestCase):
+    """
+    A class for unit testing the loadgen command line tool.
+    """
+
+    def test_generate_threads(self):
+        """
+        Tests that every record of every thread is timed and reported.
+        """
+        result = loadgen.run({"label": "threads", "threads": 3, "records": 200,
+                              "levels": "DEBUG=1,ERROR=1", "size": "10-50",
+                              "exception_rate": 0.1, "use_instance": False})
+        self.assertEqual(result["label"], "threads")
+        self.assertEqual(result["records"], 600)
+        self.assertEqual(result["dropped"], 0)
+        self.assertGreater(result["throughput"], 0)
+        self.assertLessEqual(result["p50_us"], result["p99_us"])
+        self.assertLessEqual(result["p99_us"], result["max_us"])
+
+    def test_generate_processes_file_sink(self):
+        """
+        Tests that the processes write the file sink through a queue and report their records.
+        """
+        with tempfile.TemporaryDirectory() as output:
+            result = loadgen.run({"label": "processes", "processes": 2, "threads": 2, "records": 100,
+                                  "sink": "file", "output": output,
+                                  "queue_size": 10, "overflow": "block"})
+            files = os.listdir(output)
+            self.assertEqual(len(files), 2)
+            with open(Path(output, files[0]), encoding="utf-8", mode="r") as f:
+                contents = f.read()
+        self.assertEqual(contents.count(":worker0:"), 100)
+        self.assertEqual(contents.count(":worker1:"), 100)
+        self.assertEqual(result["records"], 400)
+        self.assertEqual(result["dropped"], 0)
+
+    def test_generate_processes_dropped(self):
+        """
+        Tests that every record of the processes is either written or reported as dropped.
+        """
+        with tempfile.TemporaryDirectory() as output:
+            result = loadgen.run({"label": "dropped", "processes": 2, "threads": 2, "records": 100,
+                                  "sink": "file", "output": output,
+                                  "queue_size": 1, "overflow": "drop_newest"})
+            written = 0
+            for file_name in os.listdir(output):
+                with open(Path(output, file_name), encoding="utf-8", mode="r") as f:
+                    written += sum(1 for line in f if ":worker" in line)
+        self.assertEqual(result["records"], 400)
+        self.assertEqual(written + result["dropped"], 400)
+
+    def test_generate_handlers(self):
+        """
+        Tests that the records go to the handlers returned by the --handlers factory.
+        """
+        CAPTURED.clear()
+        result = loadgen.run({"label": "handlers", "threads": 2, "records": 20,
+                              "handlers": f"{__name__}:capture_handlers"})
+        self.assertEqual(result["records"], 40)
+        self.assertEqual(len(CAPTURED), 40)
+        self.assertEqual(sum(":worker1:" in line for line in CAPTURED), 20)
+
+    def test_load_handlers(self):
+        """
+        Tests that a handler factory is resolved from 'module:callable' and bad specs are rejected.
+        """
+        self.assertIs(loadgen.load_handlers(f"{__name__}:capture_handlers"), capture_handlers)
+        self.assertIs(loadgen.load_handlers("logging:StreamHandler"), logging.StreamHandler)
+        for spec in ("logging", "no_such_module:handlers", "logging:no_such_factory", "logging:INFO"):
+            with self.assertRaises(ValueError):
+                loadgen.load_handlers(spec)
+
+    def test_run_rejects_bad_config(self):
+        """
+        Tests that the bad values are reported before any worker starts.
+        """
+        for config in ({"processes": 1, "queue_size": 5, "overflow": "bogus"},
+                       {"levels": "BOGUS=1"},
+                       {"levels": "INFO=x"},
+                       {"levels": "INFO=0"},
+                       {"size": "abc"},
+                       {"size": "50-10"},
+                       {"threads": 0},
+                       {"handlers": "no_such_module:handlers"}):
+            with self.assertRaises(ValueError, msg=config):
+                loadgen.run({"records": 10, **config})
+
+    def test_config_keys_and_types(self):
+        """
+        Tests that the config file values of the wrong type and the unknown keys are usage errors.
+        """
+        for config in ([{"threads": "2"}], [{"thread": 4}], [{"meta": "yes"}], [{"records": True}],
+                       [{"exception_rate": 2}], {"threads": 2}, ["threads"]):
+            with tempfile.NamedTemporaryFile(mode="w", suffix=".json") as config_file:
+                json.dump(config, config_file)
+                config_file.flush()
+                with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit, msg=config) as error:
+                    loadgen.main(["generate", "--config", config_file.name])
+            self.assertEqual(error.exception.code, 2)
+
+        with self.assertRaisesRegex(ValueError, "unknown configuration keys"):
+            loadgen.run({"thread": 4})
+        # Integers are accepted for the rates, and sizes may be plain numbers.
+        self.assertEqual(loadgen.run({"records": 10, "size": 20, "speed": 1})["records"], 10)
+
+    def test_collect_late_result(self):
+        """
+        Tests that a result posted just before its process exits is collected, not reported as missing.
+        """
+        class Exited:
+            exitcode = 0
+
+            def join(self):
+                pass
+
+            def terminate(self):
+                pass
+
+        class LateQueue:
+            def __init__(self):
+                self.items = [([1], 0, None)]
+
+            def get(self, timeout=None):
+                raise queue.Empty
+
+            def get_nowait(self):
+                if not self.items:
+                    raise queue.Empty
+                return self.items.pop()
+
+        self.assertEqual(loadgen._collect([Exited()], LateQueue()), [([1], 0, None)])  # pylint: disable=protected-access
+        with self.assertRaisesRegex(RuntimeError, "exited without a result"):
+            loadgen._collect([Exited(), Exited()], LateQueue())  # pylint: disable=protected-access
+
+    def test_worker_failure(self):
+        """
+        Tests that a configuration whose workers raised, or died, fails instead of reporting a result.
+        """
+        for processes in (0, 1):
+            with self.assertRaisesRegex(RuntimeError, "did not return a list of logging.Handler"):
+                loadgen.run({"processes": processes, "records": 10, "handlers": f"{__name__}:bad_handlers"})
+        with self.assertRaisesRegex(RuntimeError, r"exit codes \[3\]"):
+            loadgen.run({"processes": 1, "records": 10, "handlers": f"{__name__}:exiting_handlers"})
+
+    def test_main_bad_values(self):
+        """
+        Tests that the command line reports the bad values as usage errors and skips the failed configurations.
+        """
+        for argv in (["--levels", "BOGUS=1"], ["--size", "abc"], ["--overflow", "bogus"]):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as error:
+                loadgen.main(["generate", "--records", "10"] + argv)
+            self.assertEqual(error.exception.code, 2)
+
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".json") as config:
+            json.dump([{"label": "good", "records": 10},
+                       {"label": "bad", "records": 10, "handlers": f"{__name__}:bad_handlers"}], config)
+            config.flush()
+            output, errors = io.StringIO(), io.StringIO()
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+                self.assertEqual(loadgen.main(["generate", "--config", config.name]), 1)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("good "))
+        self.assertTrue(errors.getvalue().startswith("bad: a worker failed"))
+
+    def test_read_log(self):
+        """
+        Tests that the entries, levels, sizes and tracebacks are read from a log file.
+        """
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".log") as log_file:
+            log_file.write(SAMPLE_LOG)
+            log_file.flush()
+            entries = loadgen.read_log(log_file.name)
+
+        self.assertEqual(len(entries), 3)
+        self.assertEqual([entry[1] for entry in entries], [logging.INFO, logging.ERROR, logging.DEBUG])
+        self.assertAlmostEqual(entries[1][0], 0.25)
+        self.assertAlmostEqual(entries[2][0], 1.0)
+        self.assertEqual(entries[0][2], len("test of 0"))
+        self.assertEqual(entries[2][2], 10)
+        self.assertEqual([entry[3] for entry in entries], [False, True, False])
+
+    def test_main_replay(self):
+        """
+        Tests that the replay mode runs from the command line and prints JSON results.
+        """
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".log") as log_file:
+            log_file.write(SAMPLE_LOG)
+            log_file.flush()
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(loadgen.main(["replay", log_file.name, "--speed", "0", "--json"]), 0)
+
+        results = json.loads(output.getvalue())
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["records"], 3)
+
+    def test_main_config(self):
+        """
+        Tests that each configuration of a config file gets a row in the table.
+        """
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".json") as config:
+            json.dump([{"label": "meta", "records": 50}, {"label": "no_meta", "meta": False, "records": 50}], config)
+            config.flush()
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                loadgen.main(["generate", "--config", config.name])
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("label"))
+        self.assertTrue(lines[1].startswith("meta "))
+        self.assertTrue(lines[2].startswith("no_meta "))
+
+    def test_percentile(self):
+        """
+        Tests the nearest rank percentiles.
+        """
+        ordered = list(range(1, 101))
+        self.assertEqual(loadgen.percentile(ordered, 50), 50)
+        self.assertEqual(loadgen.percentile(ordered, 99.9), 100)
+        self.assertEqual(loadgen.percentile([7], 50), 7)
+        self.assertEqual(loadgen.percentile([], 50), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,6 +19,7 @@
 
 import logging
 import os
+import threading
 import unittest
 from pathlib import Path
 import tempfile
@@ -116,6 +117,77 @@ class PseudoSingletonLoggerTests(unittest.TestCase):
         self.assertIn("%(lineno)d],", logger.format_keys)
         self.assertIn("%(message)s", logger.format_keys)
 
+    def test_overflow_queue(self):
+        """
+        Tests that a queue fronted logger writes through the listener and sheds DEBUG first.
+        """
+        temp_file = tempfile.NamedTemporaryFile()
+        logger = PseudoSingletonLogger(name="test_overflow_queue",
+                                       date_filename=False,
+                                       handlers=[logging.FileHandler(temp_file.name)],
+                                       queue_size=5,
+                                       overflow="drop_lowest")
+        self.assertIn("<queue>", logger.get_output_path(logger_name="test_overflow_queue"))
+        self.assertIn(temp_file.name, logger.get_output_path(logger_name="test_overflow_queue"))
+
+        # Pause the listener so the queue fills up.
+        logger.queue_listener.stop()
+        logger.error("error message")
+        for count in range(10):
+            logger.debug("debug message %d", count)
+        self.assertEqual(logger.overflow_queue.drop_counts(), {"DEBUG": 6})
+
+        logger.queue_listener.start()
+        logger.stop_queue(logger_name="test_overflow_queue")
+        with open(temp_file.name, encoding="utf-8", mode="r") as f:
+            contents = f.read()
+        self.assertIn("error message", contents)
+        self.assertIn("debug message 9", contents)
+        self.assertNotIn("debug message 0", contents)
+        self.assertIn("OverflowQueue dropped 6 records (DEBUG=6)", contents)
+        self.assertEqual(contents.count("[ERROR:"), 1)
+
+    def test_log_after_stop_queue(self):
+        """
+        Tests that the records logged after stop_queue are written directly and never block.
+        """
+        temp_file = tempfile.NamedTemporaryFile()
+        logger = PseudoSingletonLogger(name="test_log_after_stop_queue",
+                                       date_filename=False,
+                                       handlers=[logging.FileHandler(temp_file.name)],
+                                       queue_size=2,
+                                       overflow="block")
+        logger.info("before the stop")
+        logger.stop_queue(logger_name="test_log_after_stop_queue")
+        logger.stop_queue(logger_name="test_log_after_stop_queue")
+
+        writer = threading.Thread(target=lambda: [logger.warning("after the stop %d", count) for count in range(5)])
+        writer.start()
+        writer.join(timeout=5)
+        self.assertFalse(writer.is_alive())
+
+        self.assertEqual(logger.get_output_path(logger_name="test_log_after_stop_queue"), [temp_file.name])
+        with open(temp_file.name, encoding="utf-8", mode="r") as f:
+            contents = f.read()
+        self.assertIn("before the stop", contents)
+        self.assertIn("after the stop 4", contents)
+        self.assertEqual(logger.overflow_queue.drop_counts(), {})
+
+    def test_stop_queue_bound(self):
+        """
+        Tests that LoggerWrapper.stop_queue stops the queue of its own logger, not of the last created one.
+        """
+        wrapper = LoggerWrapper(name="test_stop_queue_bound_a",
+                                handlers=[logging.NullHandler()],
+                                queue_size=10)
+        other = PseudoSingletonLogger(name="test_stop_queue_bound_b",
+                                      handlers=[logging.NullHandler()],
+                                      queue_size=10)
+        wrapper.stop_queue()
+        self.assertIsNone(wrapper.logger.queue_listener)
+        self.assertIsNotNone(other.queue_listener._thread)
+        other.stop_queue(logger_name="test_stop_queue_bound_b")
+
 
 class LoggerWrapperTest(unittest.TestCase):
     """
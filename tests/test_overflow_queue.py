@@ -0,0 +1,186 @@
+#!/bin/python3
+
+#
+#  Copyright (c) 2023  Erol Yesin/SandboxZilla
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import unittest
+from pathlib import Path
+
+
+src_dir = Path(str(Path.cwd().parent),
+               'logger-wrapper',
+               'src',
+               'logger_wrapper')
+os.sys.path.insert(0, str(src_dir))
+
+from overflow_queue import OverflowQueue, OverflowQueueHandler
+
+
+
+def make_record(level: int, msg: str) -> logging.LogRecord:
+    """Build a bare log record for the given level."""
+    return logging.LogRecord("test_overflow_queue", level, __file__, 0, msg, (), None)
+
+
+def drain(log_queue: OverflowQueue) -> list:
+    """Return the messages of every buffered record, skipping the drop summaries."""
+    messages = []
+    while True:
+        try:
+            record = log_queue.get_nowait()
+        except queue.Empty:
+            return messages
+        if getattr(record, "instanceName", None) != "OverflowQueue":
+            messages.append(record.getMessage())
+
+
+class OverflowQueueTests(unittest.TestCase):
+    """
+    A class for unit testing the OverflowQueue class.
+    """
+
+    def test_fifo_across_levels(self):
+        """
+        Tests that records come out in the order they were added regardless of level.
+        """
+        log_queue = OverflowQueue(maxsize=10)
+        for level, msg in ((logging.ERROR, "a"), (logging.DEBUG, "b"), (logging.INFO, "c"), (25, "d")):
+            log_queue.put(make_record(level, msg))
+
+        self.assertEqual(log_queue.qsize(), 4)
+        self.assertEqual(drain(log_queue), ["a", "b", "c", "d"])
+        self.assertTrue(log_queue.empty())
+
+    def test_drop_newest(self):
+        """
+        Tests that the drop_newest policy keeps the buffered records.
+        """
+        log_queue = OverflowQueue(maxsize=2, policy="drop_newest")
+        for msg in "abc":
+            log_queue.put(make_record(logging.INFO, msg))
+
+        self.assertEqual(log_queue.drop_counts(), {"INFO": 1})
+        self.assertEqual(drain(log_queue), ["a", "b"])
+
+    def test_drop_oldest(self):
+        """
+        Tests that the drop_oldest policy keeps the newest records.
+        """
+        log_queue = OverflowQueue(maxsize=2, policy="drop_oldest")
+        log_queue.put(make_record(logging.ERROR, "a"))
+        log_queue.put(make_record(logging.DEBUG, "b"))
+        log_queue.put(make_record(logging.INFO, "c"))
+
+        self.assertEqual(log_queue.drop_counts(), {"ERROR": 1})
+        self.assertEqual(drain(log_queue), ["b", "c"])
+
+    def test_drop_lowest(self):
+        """
+        Tests that the drop_lowest policy sheds the lowest severity first.
+        """
+        log_queue = OverflowQueue(maxsize=3, policy="drop_lowest")
+        log_queue.put(make_record(logging.DEBUG, "debug"))
+        log_queue.put(make_record(logging.ERROR, "error"))
+        log_queue.put(make_record(logging.INFO, "info"))
+        log_queue.put(make_record(logging.CRITICAL, "critical"))
+        # The incoming record is the lowest severity, so it is the one dropped.
+        log_queue.put(make_record(logging.DEBUG, "late debug"))
+
+        self.assertEqual(log_queue.drop_counts(), {"DEBUG": 2})
+        log_queue.put(make_record(logging.WARNING, "warning"))
+        self.assertEqual(log_queue.drop_counts(), {"DEBUG": 2, "INFO": 1})
+        self.assertEqual(drain(log_queue), ["error", "critical", "warning"])
+
+    def test_block_timeout(self):
+        """
+        Tests that the block policy gives up after the timeout and counts the drop.
+        """
+        dropped = []
+        log_queue = OverflowQueue(maxsize=1, policy="block", timeout=0.01, on_drop=dropped.append)
+        log_queue.put(make_record(logging.INFO, "a"))
+        log_queue.put(make_record(logging.INFO, "b"))
+
+        self.assertEqual([record.msg for record in dropped], ["b"])
+        self.assertEqual(log_queue.drop_counts(), {"INFO": 1})
+
+    def test_drop_summary(self):
+        """
+        Tests that a WARNING summary is returned once the queue has room again.
+        """
+        log_queue = OverflowQueue(maxsize=1, policy="drop_newest")
+        log_queue.put(make_record(logging.INFO, "a"))
+        log_queue.put(make_record(logging.DEBUG, "b"))
+        log_queue.put(make_record(logging.DEBUG, "c"))
+
+        self.assertEqual(log_queue.get_nowait().getMessage(), "a")
+        summary = log_queue.get_nowait()
+        self.assertEqual(summary.levelno, logging.WARNING)
+        self.assertIn("dropped 2 records (DEBUG=2)", summary.getMessage())
+        self.assertRaises(queue.Empty, log_queue.get_nowait)
+
+    def test_closed(self):
+        """
+        Tests that a closed queue wakes the blocked producers and counts the refused records as dropped.
+        """
+        dropped = []
+        log_queue = OverflowQueue(maxsize=1, policy="block", on_drop=dropped.append)
+        log_queue.put(make_record(logging.INFO, "buffered"))
+        blocked = threading.Thread(target=log_queue.put, args=(make_record(logging.INFO, "blocked"),))
+        blocked.start()
+        log_queue.close()
+        blocked.join(timeout=5)
+        self.assertFalse(blocked.is_alive())
+
+        log_queue.put(make_record(logging.ERROR, "after close"))
+        self.assertEqual(log_queue.qsize(), 1)
+        self.assertEqual(log_queue.get(block=False).getMessage(), "buffered")
+        self.assertEqual(log_queue.drop_counts(), {"INFO": 1, "ERROR": 1})
+        self.assertEqual([record.getMessage() for record in dropped], ["blocked", "after close"])
+
+    def test_invalid_arguments(self):
+        """
+        Tests that an unknown policy or a non-positive size is rejected.
+        """
+        self.assertRaises(ValueError, OverflowQueue, maxsize=0)
+        self.assertRaises(ValueError, OverflowQueue, policy="drop_everything")
+
+    def test_handler_with_listener(self):
+        """
+        Tests that the queue works with the stock QueueListener.
+        """
+        log_queue = OverflowQueue(maxsize=100)
+        target = logging.handlers.BufferingHandler(capacity=100)
+        listener = logging.handlers.QueueListener(log_queue, target)
+        logger = logging.getLogger("test_handler_with_listener")
+        logger.addHandler(OverflowQueueHandler(log_queue))
+        logger.propagate = False
+        listener.start()
+        for count in range(10):
+            logger.warning("message %d", count)
+        listener.stop()
+
+        self.assertEqual([record.getMessage() for record in target.buffer],
+                         [f"message {count}" for count in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
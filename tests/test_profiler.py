@@ -0,0 +1,149 @@
+#!/bin/python3
+
+#
+#  Copyright (c) 2023  Erol Yesin/SandboxZilla
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import logging
+import threading
+import os
+import unittest
+from pathlib import Path
+
+
+src_dir = Path(str(Path.cwd().parent),
+               'logger-wrapper',
+               'src',
+               'logger_wrapper')
+os.sys.path.insert(0, str(src_dir))
+
+from profiler import CallSiteProfiler
+from logger_wrapper import LoggerWrapper, PseudoSingletonLogger
+
+
+class CallSiteProfilerTests(unittest.TestCase):
+    """
+    A class for unit testing the CallSiteProfiler class.
+    """
+
+    def test_per_call_site(self):
+        """
+        Tests that the calls, bytes and time are counted per call site and instance name.
+        """
+        logger = LoggerWrapper(name="test_per_call_site",
+                               instance_name="noisy",
+                               handlers=[logging.NullHandler()],
+                               profile=True)
+        for _ in range(5):
+            logger.info("0123456789")
+        logger.change_instance_name("quiet")
+        logger.info("é")
+
+        sites = {site["instance"]: site for site in logger.logger.profiler.stats()}
+        self.assertEqual(set(sites), {"noisy", "quiet"})
+        self.assertEqual(sites["noisy"]["calls"], 5)
+        self.assertEqual(sites["noisy"]["bytes"], 50)
+        self.assertEqual(sites["quiet"]["bytes"], 2)
+        self.assertGreater(sites["noisy"]["time_ns"], 0)
+        self.assertTrue(sites["noisy"]["location"].startswith("test_profiler.py:"))
+        self.assertTrue(sites["noisy"]["location"].endswith(":test_per_call_site"))
+
+    def test_per_thread_tables(self):
+        """
+        Tests that the counters of several threads are merged.
+        """
+        logger = PseudoSingletonLogger(name="test_per_thread_tables",
+                                       handlers=[logging.NullHandler()],
+                                       profile=True)
+
+        def work():
+            for _ in range(100):
+                logger.debug("from a thread")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sites = logger.profiler.stats()
+        self.assertEqual(len(sites), 1)
+        self.assertEqual(sites[0]["calls"], 400)
+        logger.profiler.reset()
+        self.assertEqual(logger.profiler.stats(), [])
+
+    def test_report(self):
+        """
+        Tests that the report ranks the call sites and counts the queue drops by level.
+        """
+        logger = PseudoSingletonLogger(name="test_profile_report",
+                                       handlers=[logging.NullHandler()],
+                                       queue_size=2,
+                                       overflow="drop_newest",
+                                       profile=True)
+        # Pause the listener so the queue fills up.
+        logger.queue_listener.stop()
+        for _ in range(4):
+            logger.info("short")
+        logger.debug("a much longer message than the others")
+
+        report = logger.get_profile_report(logger_name="test_profile_report", top=1)
+        sections = report.split("Most ")
+        self.assertEqual(len(sections), 5)
+        self.assertIn("calls=4", sections[1])
+        self.assertIn("bytes=37", sections[3])
+        self.assertIn("dropped=(INFO=2)", sections[4])
+        self.assertEqual(report.count("\n"), 7)
+
+    def test_format_error(self):
+        """
+        Tests that a record whose arguments do not fit the message is still counted, without raising.
+        """
+        logger = LoggerWrapper(name="test_format_error",
+                               handlers=[logging.NullHandler()],
+                               profile=True)
+        logger.logger.propagate = False
+        logger.info("%d items", "abc")
+
+        sites = logger.logger.profiler.stats()
+        self.assertEqual(sites[0]["calls"], 1)
+        self.assertEqual(sites[0]["bytes"], len("%d items"))
+
+    def test_wrapper_report(self):
+        """
+        Tests that the report of a LoggerWrapper is the one of its own logger, not of the last created logger.
+        """
+        logger = LoggerWrapper(name="test_wrapper_report",
+                               handlers=[logging.NullHandler()],
+                               profile=True)
+        logger.info("profiled")
+        PseudoSingletonLogger(name="test_wrapper_report_other")
+
+        report = logger.get_profile_report(top=1)
+        self.assertIsNotNone(report)
+        self.assertIn("calls=1", report)
+
+    def test_not_profiled(self):
+        """
+        Tests that a logger created without 'profile' has no report.
+        """
+        logger = PseudoSingletonLogger(name="test_not_profiled")
+        self.assertIsNone(logger.get_profile_report(logger_name="test_not_profiled"))
+        self.assertIn("Most calls:\n    -", CallSiteProfiler().report())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/bin/python3
+
+#
+#  Copyright (c) 2023  Erol Yesin/SandboxZilla
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import logging
+import os
+import threading
+import unittest
+from pathlib import Path
+import tempfile
+
+
+src_dir = Path(str(Path.cwd().parent),
+               'logger-wrapper',
+               'src',
+               'logger_wrapper')
+os.sys.path.insert(0, str(src_dir))
+
+from routing import LazyFileHandler, Route, RoutingHandler
+from logger_wrapper import LoggerWrapper
+
+
+class RoutingHandlerTests(unittest.TestCase):
+    """
+    A class for unit testing the RoutingHandler class.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def read(self, file_name: str) -> str:
+        """Return the contents of a file in the temporary directory."""
+        with open(Path(self.temp_dir.name, file_name), encoding="utf-8", mode="r") as f:
+            return f.read()
+
+    def test_split_by_level_and_instance(self):
+        """
+        Tests that records are split between the error, subsystem and aggregate files.
+        """
+        routes = [Route(Path(self.temp_dir.name, "errors.log"), level=logging.ERROR),
+                  {"target": Path(self.temp_dir.name, "db.log"), "instance": "db*"},
+                  Route(Path(self.temp_dir.name, "all.log"))]
+        router = RoutingHandler(routes)
+        db_log = LoggerWrapper(name="test_split_by_level_and_instance",
+                               instance_name="db_pool",
+                               date_filename=False,
+                               handlers=[router])
+        web_log = LoggerWrapper(name="test_split_by_level_and_instance",
+                                instance_name="web")
+
+        db_log.info("db info")
+        web_log.info("web info")
+        web_log.error("web error")
+        router.close()
+
+        self.assertEqual(self.read("errors.log").count("\n"), 1)
+        self.assertIn("web error", self.read("errors.log"))
+        self.assertIn("db info", self.read("db.log"))
+        self.assertNotIn("web", self.read("db.log"))
+        self.assertEqual(self.read("all.log").count("\n"), 3)
+        # The formatter set by the PseudoSingletonLogger is passed to the targets.
+        self.assertIn("[ERROR:", self.read("errors.log"))
+        self.assertIn(":web:", self.read("errors.log"))
+
+    def test_lazy_open(self):
+        """
+        Tests that a file target is only created when a record is routed to it.
+        """
+        errors = Path(self.temp_dir.name, "sub", "errors.log")
+        router = RoutingHandler([Route(errors, level="ERROR")])
+        logger = logging.getLogger("test_lazy_open")
+        logger.propagate = False
+        logger.addHandler(router)
+
+        logger.warning("not routed")
+        self.assertFalse(errors.exists())
+        logger.error("routed")
+        self.assertTrue(errors.exists())
+        self.assertIn(str(errors), router.get_output_path())
+        router.close()
+
+    def test_cached_dispatch(self):
+        """
+        Tests that the resolved handlers are cached per key and the cache is reset by add_route.
+        """
+        info_only = logging.NullHandler()
+        aggregate = logging.NullHandler()
+        router = RoutingHandler([Route(info_only, level=logging.INFO, max_level=logging.INFO, logger="app.*"),
+                                 Route(aggregate),
+                                 Route(aggregate, level=logging.ERROR)])
+
+        self.assertEqual(router.resolve(logging.INFO, "app.web", "web"), (info_only, aggregate))
+        self.assertEqual(router.resolve(logging.ERROR, "app.web", "web"), (aggregate,))
+        self.assertEqual(router.resolve(logging.INFO, "other", ""), (aggregate,))
+        self.assertIs(router.resolve(logging.INFO, "app.web", "web"),
+                      router.resolve(logging.INFO, "app.web", "web"))
+
+        extra = logging.NullHandler()
+        router.add_route(Route(extra, instance="web"))
+        self.assertEqual(router.resolve(logging.INFO, "app.web", "web"), (info_only, aggregate, extra))
+
+    def test_bounded_cache(self):
+        """
+        Tests that the dispatch cache stays bounded with instance names made up at run time.
+        """
+        aggregate = logging.NullHandler()
+        router = RoutingHandler([Route(aggregate)], max_cache=8)
+        for index in range(100):
+            self.assertEqual(router.resolve(logging.INFO, "app", f"request-{index}"), (aggregate,))
+            self.assertLessEqual(len(router._dispatch), 8)  # pylint: disable=protected-access
+
+    def test_add_route_while_resolving(self):
+        """
+        Tests that no entry resolved before add_route survives it while other threads resolve.
+        """
+        router = RoutingHandler([Route(logging.NullHandler())])
+        extra = logging.NullHandler()
+        stop = threading.Event()
+
+        def resolve():
+            index = 0
+            while not stop.is_set():
+                router.resolve(logging.INFO, "app", f"instance-{index % 64}")
+                index += 1
+
+        threads = [threading.Thread(target=resolve) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        router.add_route(Route(extra))
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for handlers in router._dispatch.values():  # pylint: disable=protected-access
+            self.assertIn(extra, handlers)
+
+    def test_lazy_file_handler(self):
+        """
+        Tests that the LazyFileHandler creates the missing parent directories.
+        """
+        file_name = Path(self.temp_dir.name, "a", "b", "lazy.log")
+        handler = LazyFileHandler(file_name)
+        self.assertFalse(file_name.parent.exists())
+        handler.handle(logging.makeLogRecord({"msg": "lazy"}))
+        handler.close()
+        self.assertIn("lazy", self.read("a/b/lazy.log"))
+
+
+if __name__ == '__main__':
+    unittest.main()
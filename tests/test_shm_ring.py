@@ -0,0 +1,241 @@
+#!/bin/python3
+
+#
+#  Copyright (c) 2023  Erol Yesin/SandboxZilla
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+from pathlib import Path
+import tempfile
+
+
+src_dir = Path(str(Path.cwd().parent),
+               'logger-wrapper',
+               'src',
+               'logger_wrapper')
+os.sys.path.insert(0, str(src_dir))
+
+from shm_ring import (SharedMemoryHandler, SharedMemoryListener, SharedMemoryRing,
+                      decode_record, encode_record)
+from logger_wrapper import LoggerWrapper, PseudoSingletonLogger
+
+
+def produce(ring: SharedMemoryRing, worker: int, count: int):
+    """Log 'count' records to the ring from a worker process."""
+    logger = logging.getLogger(f"test_shm_ring_worker_{worker}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.handlers = [SharedMemoryHandler(ring, timeout=5.0)]
+    for index in range(count):
+        logger.info("worker %d record %d", worker, index, extra={"instanceName": f"worker{worker}"})
+    ring.close()
+
+
+class SharedMemoryRingTests(unittest.TestCase):
+    """
+    A class for unit testing the SharedMemoryRing class.
+    """
+
+    def setUp(self):
+        self.ring = SharedMemoryRing(capacity=256)
+        self.addCleanup(self.ring.unlink)
+        self.addCleanup(self.ring.close)
+
+    def test_put_get(self):
+        """
+        Tests that frames come out in order and an empty ring returns None.
+        """
+        self.assertTrue(self.ring.put(b"first"))
+        self.assertTrue(self.ring.put(b""))
+        self.assertTrue(self.ring.put(b"third"))
+
+        self.assertEqual(self.ring.get(), b"first")
+        self.assertEqual(self.ring.get(), b"")
+        self.assertEqual(self.ring.get(), b"third")
+        self.assertIsNone(self.ring.get())
+        self.assertTrue(self.ring.empty())
+
+    def test_wraparound(self):
+        """
+        Tests that frames crossing the end of the buffer are read back intact.
+        """
+        for index in range(50):
+            data = bytes([index]) * (37 + index % 11)
+            self.assertTrue(self.ring.put(data))
+            self.assertEqual(self.ring.get(), data)
+        self.assertEqual(self.ring.dropped, 0)
+
+    def test_full_buffer(self):
+        """
+        Tests that a full buffer drops and counts the new frames.
+        """
+        data = b"x" * 60
+        written = 0
+        while self.ring.put(data):
+            written += 1
+        self.assertEqual(written, 256 // 64)
+        self.assertFalse(self.ring.put(b"x" * 1000))
+        self.assertEqual(self.ring.dropped, 2)
+
+        self.assertEqual(self.ring.get(), data)
+        self.assertTrue(self.ring.put(data))
+
+    def test_idle_backoff(self):
+        """
+        Tests that an idle consumer doubles its sleep up to max_interval and a frame resets it.
+        """
+        sleeps = []
+        real_sleep = time.sleep
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            real_sleep(seconds)
+
+        ring = SharedMemoryRing(capacity=256, poll_interval=0.001)
+        self.addCleanup(ring.unlink)
+        self.addCleanup(ring.close)
+        with mock.patch("time.sleep", side_effect=sleep):
+            self.assertIsNone(ring.get(timeout=0.1, max_interval=0.016))
+            self.assertIsNone(ring.get(timeout=0.05, max_interval=0.016))
+        self.assertEqual(sleeps[:5], [0.001, 0.002, 0.004, 0.008, 0.016])
+        self.assertLessEqual(max(sleeps), 0.016)
+        # The second call starts from the backed off sleep.
+        self.assertLess(len(sleeps), 20)
+
+        ring.put(b"wake")
+        self.assertEqual(ring.get(timeout=1.0, max_interval=0.016), b"wake")
+        sleeps.clear()
+        with mock.patch("time.sleep", side_effect=sleep):
+            ring.get(timeout=0.001, max_interval=0.016)
+        self.assertEqual(sleeps[0], 0.001)
+
+    def test_encode_decode(self):
+        """
+        Tests that a record survives the round trip with its location and instance name.
+        """
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("test_encode_decode", logging.ERROR, __file__, 42,
+                                       "failed %s", ("here",), exc_info=sys.exc_info(), func="test_encode_decode")
+        record.instanceName = "codec"
+
+        decoded = decode_record(encode_record(record))
+        self.assertEqual(decoded.name, "test_encode_decode")
+        self.assertEqual(decoded.levelname, "ERROR")
+        self.assertEqual(decoded.lineno, 42)
+        self.assertEqual(decoded.process, record.process)
+        self.assertEqual(decoded.thread, record.thread)
+        self.assertEqual(decoded.threadName, record.threadName)
+        self.assertEqual(decoded.module, "test_shm_ring")
+        self.assertEqual(decoded.funcName, "test_encode_decode")
+        self.assertEqual(decoded.instanceName, "codec")
+        self.assertEqual(decoded.created, record.created)
+        self.assertTrue(decoded.getMessage().startswith("failed here\nTraceback"))
+        self.assertIn("ValueError: boom", decoded.getMessage())
+
+    def test_pickle_attaches(self):
+        """
+        Tests that a ring passed to another process attaches to the same memory.
+        """
+        # Under fork the child inherits the ring, spawn makes it go through pickle.
+        context = multiprocessing.get_context("spawn")
+        with SharedMemoryRing(capacity=256, lock=context.Lock()) as ring:
+            process = context.Process(target=produce, args=(ring, 0, 1))
+            process.start()
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+            self.assertIn("worker 0 record 0", decode_record(ring.get()).getMessage())
+            ring.unlink()
+
+    def test_single_producer(self):
+        """
+        Tests that a single producer ring takes no lock, also once attached elsewhere.
+        """
+        with SharedMemoryRing(capacity=256, single_producer=True) as ring:
+            self.assertIsNone(ring.lock)
+            self.assertTrue(ring.put(b"unlocked"))
+            attached = SharedMemoryRing.__new__(SharedMemoryRing)
+            attached.__setstate__(ring.__getstate__())
+            self.assertIsNone(attached.lock)
+            self.assertTrue(attached.single_producer)
+            self.assertEqual(attached.get(), b"unlocked")
+            attached.close()
+            ring.unlink()
+        self.assertIsNotNone(self.ring.lock)
+        with self.assertRaises(ValueError):
+            SharedMemoryRing(capacity=256, single_producer=True, lock=multiprocessing.Lock())
+
+
+class SharedMemoryListenerTests(unittest.TestCase):
+    """
+    A class for unit testing the SharedMemoryHandler and SharedMemoryListener classes.
+    """
+
+    def test_multi_producer(self):
+        """
+        Tests that the records of several processes reach the consumer handlers formatted.
+        """
+        temp_file = tempfile.NamedTemporaryFile()
+        writer = PseudoSingletonLogger(name="test_multi_producer",
+                                       use_instance=True,
+                                       date_filename=False,
+                                       handlers=[logging.FileHandler(temp_file.name)])
+        with SharedMemoryRing(capacity=4096) as ring:
+            listener = SharedMemoryListener(ring, *writer.handlers)
+            listener.start()
+            workers = [multiprocessing.Process(target=produce, args=(ring, worker, 200)) for worker in range(3)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            listener.stop()
+            self.assertEqual(ring.dropped, 0)
+            ring.unlink()
+
+        with open(temp_file.name, encoding="utf-8", mode="r") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 600)
+        for worker in range(3):
+            messages = [line for line in lines if f"worker {worker} record" in line]
+            self.assertEqual(messages[0].rsplit(",", 1)[1], f"worker {worker} record 0")
+            self.assertEqual(messages[-1].rsplit(",", 1)[1], f"worker {worker} record 199")
+            self.assertIn(f"[INFO:pid={workers[worker].pid}:MainThread:worker{worker}:test_shm_ring:produce:",
+                          messages[0])
+
+    def test_output_path(self):
+        """
+        Tests that the PseudoSingletonLogger reports the shared memory as output path.
+        """
+        with SharedMemoryRing(capacity=1024) as ring:
+            logger = LoggerWrapper(name="test_shm_output_path",
+                                   instance_name="test_shm_output_path",
+                                   handlers=[SharedMemoryHandler(ring)])
+            self.assertEqual(logger.get_output_path(logger_name="test_shm_output_path"),
+                             [f"<shm:{ring.name}>"])
+            logger.info("through the ring")
+            self.assertEqual(decode_record(ring.get()).getMessage(), "through the ring")
+            ring.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/bin/python3
+
+#
+#  Copyright (c) 2023  Erol Yesin/SandboxZilla
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import json
+import logging
+import os
+import unittest
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+
+
+src_dir = Path(str(Path.cwd().parent),
+               'logger-wrapper',
+               'src',
+               'logger_wrapper')
+os.sys.path.insert(0, str(src_dir))
+
+from logger_wrapper import PseudoSingletonLogger
+
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1] / "src"
+
+# Runs in a fresh interpreter: imports the package, logs one record to a dated
+# file and reports the timings and the modules loaded along the way.
+STARTUP_SCRIPT = """
+import json, logging, os, sys, tempfile, time
+before = set(sys.modules)
+start = time.perf_counter()
+import logger_wrapper
+from logger_wrapper import PseudoSingletonLogger
+imported = time.perf_counter()
+log_dir = tempfile.mkdtemp()
+logger = PseudoSingletonLogger(name="startup",
+                               handlers=[logging.FileHandler(os.path.join(log_dir, "startup.log"), delay=True)])
+constructed = time.perf_counter()
+created_early = os.listdir(log_dir)
+logger.info("first record")
+logged = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000,
+                  "construct_ms": (constructed - imported) * 1000,
+                  "first_log_ms": (logged - constructed) * 1000,
+                  "created_early": created_early,
+                  "created": os.listdir(log_dir),
+                  "modules": sorted(set(sys.modules) - before)}))
+"""
+
+HEAVY_MODULES = ("logging.handlers", "pathlib", "multiprocessing", "socket", "queue",
+                 "logger_wrapper.overflow_queue", "logger_wrapper.routing",
+                 "logger_wrapper.shm_ring", "logger_wrapper.profiler")
+
+
+def run_startup() -> dict:
+    """Run the startup script in a fresh interpreter and return its report."""
+    env = dict(os.environ, PYTHONPATH=str(PACKAGE_DIR))
+    output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+class StartupBenchmarkTests(unittest.TestCase):
+    """
+    A class for benchmarking the import time and the first record latency.
+    """
+
+    def test_import_is_lazy(self):
+        """
+        Tests that importing the package and logging a record does not load the optional modules.
+        """
+        report = run_startup()
+        self.assertIn("logger_wrapper.logger_wrapper", report["modules"])
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, report["modules"])
+
+    def test_startup_latency(self):
+        """
+        Benchmarks the import time and the first record latency of a fresh interpreter.
+        """
+        reports = [run_startup() for _ in range(3)]
+        best = {key: min(report[key] for report in reports)
+                for key in ("import_ms", "construct_ms", "first_log_ms")}
+        print(f"\nstartup benchmark (best of 3): " +
+              ", ".join(f"{key}={value:.2f}" for key, value in best.items()), file=sys.stderr)
+
+        # Generous bounds, the point is to catch an eager heavy import creeping back.
+        self.assertLess(best["import_ms"], 250)
+        self.assertLess(best["construct_ms"] + best["first_log_ms"], 250)
+        for report in reports:
+            self.assertEqual(report["created_early"], [])
+            self.assertEqual(len(report["created"]), 1)
+
+
+class DeferredFileTests(unittest.TestCase):
+    """
+    A class for unit testing the deferred file creation of the date_filename option.
+    """
+
+    def test_date_filename_deferred(self):
+        """
+        Tests that the dated file and its directories are only created by the first record.
+        """
+        with tempfile.TemporaryDirectory() as log_dir:
+            log_path = Path(log_dir, "sub", "dated.log")
+            handler = logging.FileHandler(log_path, delay=True)
+            logger = PseudoSingletonLogger(name="test_date_filename_deferred",
+                                           handlers=[handler])
+            self.assertFalse(log_path.parent.exists())
+
+            logger.info("deferred")
+            files = list(log_path.parent.iterdir())
+            self.assertEqual(len(files), 1)
+            self.assertTrue(files[0].name.startswith("dated_"))
+            self.assertEqual(files[0].suffix, ".log")
+            logger.handlers[0].close()
+            with open(files[0], encoding="utf-8", mode="r") as f:
+                self.assertIn("deferred", f.read())
+
+    def test_original_removed_on_first_record(self):
+        """
+        Tests that the file opened by the given handler is removed when the dated file is created.
+        """
+        with tempfile.TemporaryDirectory() as log_dir:
+            log_path = Path(log_dir, "original")
+            logger = PseudoSingletonLogger(name="test_original_removed_on_first_record",
+                                           handlers=[logging.FileHandler(log_path)])
+            self.assertEqual([path.name for path in Path(log_dir).iterdir()], ["original"])
+            self.assertIn(str(Path(log_dir, "original_")),
+                          logger.get_output_path(logger_name="test_original_removed_on_first_record",
+                                                 handler_type=logging.FileHandler)[0])
+
+            logger.info("dated")
+            names = [path.name for path in Path(log_dir).iterdir()]
+            self.assertEqual(len(names), 1)
+            self.assertTrue(names[0].startswith("original_"))
+            self.assertTrue(names[0].endswith(".log"))
+            logger.handlers[0].close()
+
+
+if __name__ == '__main__':
+    unittest.main()